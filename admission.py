@@ -0,0 +1,116 @@
+import asyncio
+import contextvars
+from typing import Dict, Optional
+
+from metrics import ADMISSIONS
+from ratelimit import TokenBucket
+
+
+# Set for offline work (batch jobs) whose calls should queue for a token however long it takes
+_WAIT_FOR_TOKENS = contextvars.ContextVar('wait_for_tokens', default=False)
+
+
+def wait_for_tokens() -> None:
+    """Make admission in the current context, and tasks started from it, wait instead of shedding"""
+    _WAIT_FOR_TOKENS.set(True)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a provider call is shed instead of queued"""
+
+    def __init__(self, provider: str, reason: str):
+        super().__init__(f"{provider} call shed: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+class AdmissionController:
+    """Per-provider token buckets in front of upstream calls, with a bounded wait queue.
+
+    A call takes a token at once when one is free. Otherwise it waits in its
+    provider's FIFO queue, unless `max_queue` calls are already waiting or
+    its turn would come after its deadline (at most `max_wait` seconds). Those
+    calls are rejected immediately, so callers can answer from the local
+    catalog instead of stacking up behind the rate limit. Calls made under
+    `wait_for_tokens()` always queue, with no deadline; interactive calls
+    see them in the queue depth. Providers without a configured rate are
+    always admitted. Must be used from a single event loop, except stats()
+    and expected_wait(), which only read and may be called from any thread.
+    """
+
+    def __init__(self, rate_limits: Optional[Dict[str, float]] = None, max_queue: int = 16, max_wait: float = 2.0):
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._waiting: Dict[str, int] = {}
+        self.set_rate_limits(rate_limits or {})
+
+    @property
+    def rate_limits(self) -> Dict[str, float]:
+        return {provider: bucket.rate for provider, bucket in self._buckets.items()}
+
+    def set_rate_limits(self, rate_limits: Dict[str, float]) -> None:
+        self._buckets = {provider: TokenBucket(rate) for provider, rate in rate_limits.items()}
+
+    def expected_wait(self, provider: str) -> float:
+        """Seconds until a call joining the queue now would get its token"""
+        bucket = self._buckets.get(provider)
+        if bucket is None:
+            return 0.0
+        return bucket.wait_time() + self._waiting.get(provider, 0) / bucket.rate
+
+    def has_capacity(self, provider: str, budget: Optional[float] = None) -> bool:
+        """Whether a call would be admitted within `budget` seconds (and max_wait)"""
+        if provider not in self._buckets or _WAIT_FOR_TOKENS.get():
+            return True
+        if self._waiting.get(provider, 0) >= self.max_queue:
+            return False
+        limit = self.max_wait if budget is None else min(self.max_wait, budget)
+        return self.expected_wait(provider) <= limit
+
+    async def admit(self, provider: str, budget: Optional[float] = None) -> None:
+        """Wait for the provider's next token, or raise AdmissionRejected"""
+        bucket = self._buckets.get(provider)
+        if bucket is None:
+            return
+        if not self._waiting.get(provider) and bucket.try_acquire():
+            ADMISSIONS.inc(provider, 'admitted')
+            return
+        if _WAIT_FOR_TOKENS.get():
+            self._waiting[provider] = self._waiting.get(provider, 0) + 1
+            try:
+                await bucket.acquire()
+            finally:
+                self._waiting[provider] -= 1
+            ADMISSIONS.inc(provider, 'queued')
+            return
+
+        limit = self.max_wait if budget is None else min(self.max_wait, budget)
+        if self._waiting.get(provider, 0) >= self.max_queue:
+            ADMISSIONS.inc(provider, 'queue_full')
+            raise AdmissionRejected(provider, 'queue full')
+        if self.expected_wait(provider) > limit:
+            ADMISSIONS.inc(provider, 'deadline')
+            raise AdmissionRejected(provider, 'deadline cannot be met')
+
+        self._waiting[provider] = self._waiting.get(provider, 0) + 1
+        try:
+            await asyncio.wait_for(bucket.acquire(), max(0.0, limit))
+        except asyncio.TimeoutError:
+            ADMISSIONS.inc(provider, 'deadline')
+            raise AdmissionRejected(provider, 'deadline passed while queued') from None
+        finally:
+            self._waiting[provider] -= 1
+        ADMISSIONS.inc(provider, 'queued')
+
+    def stats(self) -> Dict[str, Dict]:
+        """Rate, queue depth and admission outcomes per rate-limited provider"""
+        return {
+            provider: {
+                'rate': bucket.rate,
+                'waiting': self._waiting.get(provider, 0),
+                'expected_wait': round(self.expected_wait(provider), 3),
+                **{outcome: ADMISSIONS.value(provider, outcome) for outcome in ('admitted', 'queued', 'queue_full', 'deadline')}
+            }
+            for provider, bucket in self._buckets.items()
+        }
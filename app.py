@@ -1,16 +1,126 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, g, render_template, request, jsonify, stream_with_context
+from werkzeug.local import LocalProxy
+from typing import Optional
 from main import AIToolRecommendationSystem
+from batch import BATCH_MODES, parse_query_line, run_batch_stream
+from cache import normalize_query
+from http_cache import MIN_COMPRESS_SIZE, compress, encoded_etag, etag_matches, json_body, negotiate_encoding, strong_etag
+from metrics import REGISTRY, REQUEST_SECONDS, configure_logging, set_trace_id, usage_report
 import json
 import os
+import time
 
-app = Flask(__name__)
-system = AIToolRecommendationSystem()
+bp = Blueprint('tools', __name__)
 
-@app.route('/')
+# The system owned by the app handling the current request (see create_app)
+system: AIToolRecommendationSystem = LocalProxy(lambda: current_app.extensions['ai_tools'])
+
+def register_collectors(system: AIToolRecommendationSystem) -> None:
+    """Gauges read at scrape time from state the system already keeps"""
+    levels = {'open': 1, 'half_open': 0.5}
+    
+    def cache_sizes():
+        sizes = {('exact',): system.cache.stats()['size']}
+        if system.semantic_cache is not None:
+            sizes[('semantic',)] = system.semantic_cache.stats()['size']
+        return sizes
+    
+    REGISTRY.collector('ai_tools_circuit_open', 'Circuit state per provider/model: 1 open, 0.5 half-open, 0 closed',
+                       ('key',), lambda: {(key,): levels.get(state['state'], 0)
+                                          for key, state in system.health.snapshot().items()})
+    REGISTRY.collector('ai_tools_cache_entries', 'Entries held per result cache tier', ('tier',), cache_sizes)
+    REGISTRY.collector('ai_tools_hedge_events', 'Hedged request counters', ('event',),
+                       lambda: {(event,): value for event, value in system.hedge_budget.stats().items()
+                                if event in ('requests', 'hedges_fired', 'hedges_won', 'hedges_denied')})
+    REGISTRY.collector('ai_tools_single_flight_events', 'In-flight query coalescing counters', ('event',),
+                       lambda: {(event,): value for event, value in system.single_flight.stats().items()})
+
+def create_app(system: Optional[AIToolRecommendationSystem] = None) -> Flask:
+    """Build the web app and its recommendation system. The module-level `app`
+    below is one, built when a gunicorn worker imports this module after the
+    fork; call this directly for tests or to embed the app elsewhere"""
+    configure_logging(os.environ.get('LOG_LEVEL', 'INFO'), os.environ.get('LOG_FORMAT', 'json'))
+    
+    app = Flask(__name__)
+    # Each worker builds its own system (event loop, connection pools) after the fork;
+    # results and circuit state are shared between workers through the SQLite files
+    system = system or AIToolRecommendationSystem()
+    app.extensions['ai_tools'] = system
+    app.register_blueprint(bp)
+    register_collectors(system)
+    if os.environ.get('CACHE_WARM', 'true').lower() not in ('0', 'false', 'no'):
+        system.start_cache_warmer()
+    return app
+
+@bp.before_app_request
+def start_trace():
+    # Honour an upstream request ID so logs can be joined across services
+    g.trace_id = set_trace_id(request.headers.get('X-Request-ID'))
+    g.started = time.perf_counter()
+
+@bp.after_app_request
+def finish_trace(response):
+    response.headers['X-Trace-ID'] = g.trace_id
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_SECONDS.observe(time.perf_counter() - g.started, endpoint, request.method, str(response.status_code))
+    return response
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/plain')
+
+@bp.after_app_request
+def compress_response(response):
+    # Streams (SSE, JSONL batches) are left alone so each event is flushed as it is produced
+    if (response.mimetype not in COMPRESSIBLE_TYPES or response.is_streamed
+            or response.direct_passthrough or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200:
+        return response
+    body, encoding = compress(response.get_data(), negotiate_encoding(request.headers.get('Accept-Encoding')))
+    if encoding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        etag = response.headers.get('ETag', '')
+        if etag.startswith('"'):
+            response.headers['ETag'] = encoded_etag(etag.strip('"'), encoding)
+    return response
+
+def cacheable_result(endpoint: str, search):
+    """GET variant of a search: keyed by the normalized query, with a strong ETag,
+    304 for a matching If-None-Match and max-age tied to the backend cache entry"""
+    try:
+        query = request.args.get('query', '').strip()
+        normalized = normalize_query(query)
+        if not normalized:
+            return jsonify({'error': 'Please provide a query'}), 400
+        
+        system.log_query(endpoint, query)
+        result = system.runtime.run(search(query))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    # Equivalent wordings get byte-identical bodies, hence the same ETag
+    body = json_body(dict(result, query=normalized))
+    etag = strong_etag(body)
+    expires_in = system.cache_expires_in(endpoint, query)
+    headers = {
+        'ETag': encoded_etag(etag, None),
+        # Results that are not in the backend cache (local fallbacks) must be revalidated
+        'Cache-Control': f'public, max-age={int(expires_in)}' if expires_in else 'public, no-cache',
+        'Vary': 'Accept-Encoding',
+    }
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        # Same tag the 200 would carry once compress_response has encoded it
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding')) if len(body) >= MIN_COMPRESS_SIZE else None
+        headers['ETag'] = encoded_etag(etag, encoding)
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype='application/json', headers=headers)
+
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/recommend', methods=['POST'])
+@bp.route('/recommend', methods=['POST'])
 def recommend():
     try:
         data = request.get_json()
@@ -19,13 +129,22 @@ def recommend():
         if not query:
             return jsonify({'error': 'Please provide a query'}), 400
         
-        result = system.recommend_tools(query)
+        system.log_query('recommend_tools', query)
+        result = system.runtime.run(system.recommend_tools_async(query))
         return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/find-with-ai', methods=['POST'])
+@bp.route('/recommend', methods=['GET'])
+def recommend_get():
+    return cacheable_result('recommend_tools', system.recommend_tools_async)
+
+@bp.route('/find-with-ai', methods=['GET'])
+def find_with_ai_get():
+    return cacheable_result('find_with_ai', system.find_with_ai_async)
+
+@bp.route('/find-with-ai', methods=['POST'])
 def find_with_ai():
     try:
         data = request.get_json()
@@ -34,12 +153,111 @@ def find_with_ai():
         if not query:
             return jsonify({'error': 'Please provide a query'}), 400
         
-        result = system.find_with_ai(query)
+        system.log_query('find_with_ai', query)
+        result = system.runtime.run(system.find_with_ai_async(query))
         return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+BATCH_MAX_QUERIES = int(os.environ.get('BATCH_MAX_QUERIES', 1000))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 8))
+
+@bp.route('/recommend/batch', methods=['POST'])
+def recommend_batch():
+    # Accepts {"queries": [...], "mode": "recommend"} or a JSONL body of queries
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        queries = data.get('queries', [])
+        if not isinstance(queries, list):
+            return jsonify({'error': 'queries must be a list of strings'}), 400
+        queries = [q for q in queries if isinstance(q, str) and q.strip()]
+        mode = data.get('mode', 'recommend')
+    else:
+        lines = request.get_data(as_text=True).splitlines()
+        queries = [q for q in map(parse_query_line, lines) if q and q.strip()]
+        mode = request.args.get('mode', 'recommend')
+    
+    if not queries:
+        return jsonify({'error': 'Please provide at least one query'}), 400
+    if len(queries) > BATCH_MAX_QUERIES:
+        return jsonify({'error': f'At most {BATCH_MAX_QUERIES} queries per batch'}), 413
+    if mode not in BATCH_MODES:
+        return jsonify({'error': f'mode must be one of {list(BATCH_MODES)}'}), 400
+    
+    def records():
+        batch = run_batch_stream(system, queries, mode, BATCH_CONCURRENCY)
+        for record in system.runtime.iterate(batch):
+            yield json.dumps(record) + '\n'
+    
+    # Results are streamed as JSONL in completion order
+    return Response(stream_with_context(records()), mimetype='application/x-ndjson')
+
+@bp.route('/find-with-ai/stream', methods=['GET'])
+def find_with_ai_stream():
+    query = request.args.get('query', '').strip()
+    if not query:
+        return jsonify({'error': 'Please provide a query'}), 400
+    system.log_query('find_with_ai', query)
+    
+    def events():
+        try:
+            for event in system.runtime.iterate(system.find_with_ai_stream_async(query)):
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    stats = dict(system.cache.stats(), single_flight=system.single_flight.stats())
+    if system.semantic_cache is not None:
+        stats['semantic'] = system.semantic_cache.stats()
+    return jsonify(stats)
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/health/providers', methods=['GET'])
+def provider_health():
+    return jsonify(system.health.snapshot())
+
+@bp.route('/hedging/stats', methods=['GET'])
+def hedging_stats():
+    return jsonify(system.hedge_budget.stats())
+
+@bp.route('/links/stats', methods=['GET'])
+def link_stats():
+    return jsonify(dict(system.link_verifier.stats(), mode=system.link_verify_mode))
+
+@bp.route('/usage/stats', methods=['GET'])
+def usage_stats():
+    prompts = {'recommend_tools': system.recommend_prompt, 'find_with_ai': system.find_prompt}
+    return jsonify({
+        'providers': usage_report(),
+        'max_tokens': {endpoint: prompt.max_tokens for endpoint, prompt in prompts.items()}
+    })
+
+@bp.route('/warmup/stats', methods=['GET'])
+def warmup_stats():
+    if system.cache_warmer is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(system.cache_warmer.stats(), enabled=system.cache_warming))
+
+@bp.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    return jsonify(system.admission.stats())
+
+# For `gunicorn app:app`, `flask run` and `from app import app`. Without --preload
+# every worker imports this module after the fork and builds its own system
+app = create_app()
+
 if __name__ == '__main__':
     print("🚀 Starting AI Tool Recommendation Web Server...")
     
@@ -51,5 +269,6 @@ if __name__ == '__main__':
     
     print(f"📍 Visit: http://localhost:{port}")
     
-    # Use debug=False for production
+    # Use debug=False for production; for several worker processes run
+    # gunicorn app:app instead
     app.run(debug=False, host=host, port=port)
@@ -0,0 +1,105 @@
+import queue
+import asyncio
+import threading
+import contextvars
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+
+async def _in_context(coro: Awaitable, context: contextvars.Context) -> Any:
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+class AsyncRuntime:
+    """A background event loop that owns all non-blocking upstream I/O.
+
+    Sync callers (the CLI, Flask worker threads) block on run(); coroutines
+    running on another event loop await wrap(). Either way the upstream
+    requests themselves are multiplexed on this single loop.
+    """
+
+    def __init__(self, name: str = 'upstream-io'):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The runtime's event loop, started on first use"""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    ready = threading.Event()
+
+                    def serve():
+                        asyncio.set_event_loop(loop)
+                        loop.call_soon(ready.set)
+                        loop.run_forever()
+
+                    self._thread = threading.Thread(target=serve, name=self.name, daemon=True)
+                    self._thread.start()
+                    ready.wait()
+                    self._loop = loop
+        return self._loop
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Awaitable) -> 'asyncio.Future':
+        """Schedule a coroutine on the runtime loop and return a concurrent Future.
+
+        The caller's context variables (e.g. the request's trace ID) are
+        carried over to the task on the loop.
+        """
+        return asyncio.run_coroutine_threadsafe(_in_context(coro, contextvars.copy_context()), self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the runtime loop and block until it finishes"""
+        if self.in_loop_thread():
+            raise RuntimeError("AsyncRuntime.run() called from the runtime loop; await the coroutine instead")
+        return self.submit(coro).result(timeout)
+
+    async def wrap(self, coro: Awaitable) -> Any:
+        """Await a coroutine on the runtime loop from any other event loop"""
+        if asyncio.get_running_loop() is self._loop:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def iterate(self, agen: AsyncIterator) -> Iterator:
+        """Drive an async generator on the runtime loop and yield its items synchronously"""
+        items = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put(item)
+            except BaseException as e:
+                items.put(e)
+            finally:
+                items.put(done)
+
+        future = self.submit(pump())
+        try:
+            while True:
+                item = items.get()
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Client went away or the consumer stopped early: stop the upstream stream too
+            future.cancel()
+
+    def close(self) -> None:
+        """Stop the loop thread"""
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop = None
+                self._thread = None
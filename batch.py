@@ -0,0 +1,156 @@
+import os
+import json
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Iterable, Iterator, Optional, Set
+
+from admission import wait_for_tokens
+from cache import normalize_query
+from metrics import set_trace_id
+
+BATCH_MODES = ('recommend', 'find_with_ai')
+# Source prefix of answers from the local catalog (main.LOCAL_SOURCE and its shed variant)
+LOCAL_SOURCE_PREFIX = 'Local database'
+
+logger = logging.getLogger(__name__)
+
+
+def parse_query_line(line: str) -> Optional[str]:
+    """Extract the query from one JSONL line: a JSON string, an object with
+    'query' (or 'title'), or plain text"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return line
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        query = item.get('query') or item.get('title')
+        return query if isinstance(query, str) else None
+    return None
+
+
+def read_queries(path: str) -> Iterator[str]:
+    """Stream queries from a JSONL file without loading it into memory"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            query = parse_query_line(line)
+            if query and query.strip():
+                yield query.strip()
+
+
+def is_final(record: Dict) -> bool:
+    """Whether a batch record is an LLM answer; errors and local-catalog fallbacks are retried"""
+    result = record.get('result')
+    return isinstance(result, dict) and not str(result.get('source', '')).startswith(LOCAL_SOURCE_PREFIX)
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """Normalized queries the output file already holds a final result for"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if is_final(record):
+                    done.add(record['normalized'])
+            except (ValueError, KeyError, TypeError, AttributeError):
+                continue  # partial line from an interrupted write
+    return done
+
+
+async def run_batch_stream(system, queries: Iterable[str], mode: str = 'recommend', concurrency: int = 8,
+                           skip: Optional[Set[str]] = None) -> AsyncIterator[Dict]:
+    """Run queries with bounded concurrency, yielding one record per distinct
+    normalized query in completion order.
+
+    Provider calls wait for rate-limit tokens instead of being shed to the
+    local catalog: a batch trades latency for complete results.
+    """
+    if mode not in BATCH_MODES:
+        raise ValueError(f"Unknown batch mode '{mode}', expected one of {BATCH_MODES}")
+    wait_for_tokens()  # inherited by the worker tasks below
+    run = system.recommend_tools_async if mode == 'recommend' else system.find_with_ai_async
+    seen = set(skip or ())
+    work = asyncio.Queue(maxsize=concurrency * 2)
+    results = asyncio.Queue()
+    finished = object()
+
+    async def produce():
+        try:
+            for query in queries:
+                normalized = normalize_query(query)
+                if not normalized or normalized in seen:
+                    continue
+                seen.add(normalized)
+                await work.put((query, normalized))
+        finally:
+            for _ in range(concurrency):
+                await work.put(None)
+
+    async def worker():
+        while True:
+            item = await work.get()
+            if item is None:
+                break
+            query, normalized = item
+            set_trace_id()  # one trace per query; upstream calls inherit it
+            try:
+                record = {'query': query, 'normalized': normalized, 'result': await run(query)}
+            except Exception as e:
+                record = {'query': query, 'normalized': normalized, 'error': str(e)}
+            await results.put(record)
+        await results.put(finished)
+
+    tasks = [asyncio.ensure_future(produce())] + [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    try:
+        remaining = concurrency
+        while remaining:
+            record = await results.get()
+            if record is finished:
+                remaining -= 1
+            else:
+                yield record
+        await tasks[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_batch(system, input_path: str, output_path: str, mode: str = 'recommend',
+                    concurrency: int = 8) -> Dict:
+    """Run every query in input_path and append results to output_path as JSONL.
+
+    The output file doubles as the checkpoint: queries with an LLM answer in
+    it are skipped, so an interrupted run resumes where it stopped. Errors
+    and local-catalog fallbacks are run again, and the newer line for a
+    query supersedes the older one.
+    """
+    done = load_checkpoint(output_path)
+    summary = {'skipped': len(done), 'completed': 0, 'errors': 0, 'fallbacks': 0}
+
+    # Terminate a line left half-written by an interrupted run
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    with open(output_path, 'a', encoding='utf-8') as out:
+        async for record in run_batch_stream(system, read_queries(input_path), mode, concurrency, skip=done):
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            summary['completed'] += 1
+            if 'error' in record:
+                summary['errors'] += 1
+            elif not is_final(record):
+                summary['fallbacks'] += 1
+            if summary['completed'] % 100 == 0:
+                logger.info("%d batch queries done", summary['completed'])
+
+    return summary
@@ -0,0 +1,119 @@
+"""Exercise the link verifier against a local aiohttp server with known outcomes,
+including redirects and a redirect into an address that must not be probed.
+
+    python bench/link_check.py
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+
+from aiohttp import web
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from http_pool import ProviderSessions  # noqa: E402
+from linkcheck import LinkVerifier  # noqa: E402
+
+
+class LoopbackIsPublic(LinkVerifier):
+    """Treats 127.0.0.1 as public and every other name (e.g. localhost) as private,
+    so the private-address guard can be checked without leaving the machine"""
+
+    async def _is_public(self, host: str) -> bool:
+        return host == '127.0.0.1'
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_app(port: int, hits: dict) -> web.Application:
+    async def handler(request: web.Request) -> web.StreamResponse:
+        hits[request.path] = hits.get(request.path, 0) + 1
+        path = request.path
+        if path == '/ok':
+            return web.Response(text='ok')
+        if path == '/gone':
+            return web.Response(status=404)
+        if path == '/no-head':
+            return web.Response(status=405 if request.method == 'HEAD' else 200)
+        if path == '/forbidden':
+            return web.Response(status=403)
+        if path == '/error':
+            return web.Response(status=503)
+        if path == '/slow':
+            await asyncio.sleep(5)
+            return web.Response(text='late')
+        if path == '/redirect':
+            raise web.HTTPFound('/ok')
+        if path == '/redirect-gone':
+            raise web.HTTPMovedPermanently('/gone')
+        if path == '/redirect-loop':
+            raise web.HTTPFound('/redirect-loop')
+        if path == '/redirect-private':
+            raise web.HTTPFound(f'http://localhost:{port}/private')
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handler)
+    return app
+
+
+# path -> expected outcome (True alive, False dead, None unknown)
+EXPECTED = {
+    '/ok': True,
+    '/gone': False,
+    '/no-head': True,
+    '/forbidden': True,
+    '/error': None,
+    '/slow': None,
+    '/redirect': True,
+    '/redirect-gone': False,
+    '/redirect-loop': None,
+    '/redirect-private': None,
+}
+
+
+async def main() -> int:
+    port = free_port()
+    hits = {}
+    runner = web.AppRunner(make_app(port, hits))
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    http = ProviderSessions()
+    verifier = LoopbackIsPublic(http, timeout=1.0)
+    base = f'http://127.0.0.1:{port}'
+    failures = 0
+    try:
+        started = time.perf_counter()
+        outcomes = await verifier.verify(base + path for path in EXPECTED)
+        elapsed = time.perf_counter() - started
+        for path, expected in EXPECTED.items():
+            alive = outcomes[base + path]
+            ok = alive == expected
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {path:<18} {alive!s:<6} (expected {expected})")
+        if hits.get('/private'):
+            failures += 1
+            print("❌ redirect target on a private host was contacted")
+        else:
+            print("✅ redirect target on a private host was not contacted")
+
+        # A refused port is dead, and cached per host:port
+        dead = f'http://127.0.0.1:{free_port()}/anything'
+        failures += await verifier.check(dead) is not False
+        failures += verifier.cached(dead.replace('anything', 'else')) is not False
+        print(f"⏱️  {len(EXPECTED)} links checked concurrently in {elapsed:.2f}s; stats {verifier.stats()}")
+    finally:
+        await http.close()
+        await runner.cleanup()
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if asyncio.run(main()) else 0)
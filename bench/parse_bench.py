@@ -0,0 +1,57 @@
+"""Micro-benchmark: extract_json_array vs the old regex-then-json.loads extraction.
+
+    python bench/parse_bench.py --number 2000
+"""
+import os
+import re
+import sys
+import json
+import timeit
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from llm_json import extract_json_array  # noqa: E402
+
+TOOLS = json.dumps([
+    {"name": f"Tool {i}", "link": f"https://tool{i}.example.com", "description": f"Does useful thing number {i}."}
+    for i in range(5)
+], indent=2)
+
+INPUTS = {
+    'clean_array': TOOLS,
+    'fenced': f"```json\n{TOOLS}\n```",
+    'chatty_20kb': ("Here is some background on the tools I considered. " * 400) + TOOLS + " Hope that helps [1]!",
+    'prose_brackets': "Based on [your request] and [prior context], see [1][2]: " + TOOLS + " [end]",
+    'truncated': TOOLS[:len(TOOLS) // 2],
+}
+
+
+def legacy_parse(text: str):
+    """The previous approach: greedy DOTALL regex, then json.loads"""
+    match = re.search(r'\[.*\]', text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group())
+    except ValueError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare LLM response parsers")
+    parser.add_argument('--number', type=int, default=2000, help="Calls per input and parser")
+    args = parser.parse_args()
+
+    print(f"{'input':<16} {'legacy µs':>10} {'scanner µs':>11}   legacy ok  scanner ok")
+    for name, text in INPUTS.items():
+        legacy = timeit.timeit(lambda: legacy_parse(text), number=args.number) / args.number * 1e6
+        scanner = timeit.timeit(lambda: extract_json_array(text), number=args.number) / args.number * 1e6
+        legacy_ok = isinstance(legacy_parse(text), list)
+        scanner_ok = isinstance(extract_json_array(text), list)
+        print(f"{name:<16} {legacy:>10.1f} {scanner:>11.1f}   {str(legacy_ok):<9}  {scanner_ok}")
+
+
+if __name__ == '__main__':
+    main()
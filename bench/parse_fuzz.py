@@ -0,0 +1,142 @@
+"""Fuzz the LLM response parser against a corpus of real-world completion shapes.
+
+Checks every corpus entry against its expected tool count, then mutates
+each entry (truncation, stray brackets/quotes/commas, prose and fence
+wrapping) and asserts the parser never raises, returns a list or None,
+and still finds the original array when it is only wrapped. Finally it
+times pathological inputs at growing sizes to confirm cost stays linear.
+
+    python bench/parse_fuzz.py --iterations 2000 --seed 1
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from llm_json import extract_json_array  # noqa: E402
+
+CORPUS_PATH = os.path.join(BENCH_DIR, 'corpus', 'llm_responses.jsonl')
+NOISE = '[]{}",\\:` \n'
+PROSE = ["Sure! Here you go:", "Hope this helps.", "Note: results may vary.", "Here's what I found —", "Let me know!"]
+
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def check_corpus(corpus: List[Dict]) -> int:
+    failures = 0
+    for case in corpus:
+        result = extract_json_array(case['text'])
+        got = None if result is None else len(result)
+        if got != case['expected_tools']:
+            failures += 1
+            print(f"❌ {case['name']}: expected {case['expected_tools']}, got {got}")
+    print(f"📚 Corpus: {len(corpus) - failures}/{len(corpus)} cases as expected")
+    return failures
+
+
+def truncate(text: str, rng: random.Random) -> str:
+    return text[:rng.randrange(len(text) + 1)]
+
+
+def insert_noise(text: str, rng: random.Random) -> str:
+    chars = list(text)
+    for _ in range(rng.randint(1, 5)):
+        chars.insert(rng.randrange(len(chars) + 1), rng.choice(NOISE))
+    return ''.join(chars)
+
+
+def wrap_in_prose(text: str, rng: random.Random) -> str:
+    return f"{rng.choice(PROSE)}\n\n{text}\n\n{rng.choice(PROSE)}"
+
+
+def wrap_in_fence(text: str, rng: random.Random) -> str:
+    return f"```{rng.choice(['json', ''])}\n{text}\n```"
+
+
+MUTATIONS: Dict[str, Callable[[str, random.Random], str]] = {
+    'truncate': truncate,
+    'noise': insert_noise,
+    'prose': wrap_in_prose,
+    'fence': wrap_in_fence,
+}
+# Wrapping must never change what is found
+PRESERVING = {'prose', 'fence'}
+
+
+def fuzz(corpus: List[Dict], iterations: int, rng: random.Random) -> int:
+    failures = 0
+    for _ in range(iterations):
+        case = rng.choice(corpus)
+        name = rng.choice(list(MUTATIONS))
+        text = MUTATIONS[name](case['text'], rng)
+        try:
+            result = extract_json_array(text)
+        except Exception as e:
+            failures += 1
+            print(f"❌ {case['name']}/{name} raised {e!r}: {text[:120]!r}")
+            continue
+        if result is not None and not isinstance(result, list):
+            failures += 1
+            print(f"❌ {case['name']}/{name} returned {type(result).__name__}")
+        elif name in PRESERVING and result != extract_json_array(case['text']):
+            failures += 1
+            print(f"❌ {case['name']}/{name} changed the result: {text[:120]!r}")
+    print(f"🎲 Fuzz: {iterations - failures}/{iterations} mutations passed")
+    return failures
+
+
+PATHOLOGICAL = {
+    'open_brackets': lambda n: '[' * n,
+    'open_objects': lambda n: '[' + '{"a":' * n,
+    'prose_brackets': lambda n: 'see [x] ' * (n // 8),
+    'unterminated_string': lambda n: '[{"a": "' + 'x' * n,
+    'many_commas': lambda n: '[' + ',' * n,
+    'numbers_array': lambda n: '[' + '1,' * (n // 2) + '1]',
+    'nested_invalid': lambda n: '[{"a":1}, ' * (n // 10) + 'oops' + ']' * (n // 10),
+    'invalid_siblings': lambda n: '[' + '[{"a":x},],' * (n // 11) + ']',
+}
+
+
+def check_linear(sizes: List[int]) -> int:
+    """Time each pathological input at growing sizes; flag super-linear growth"""
+    failures = 0
+    for name, build in PATHOLOGICAL.items():
+        timings = []
+        for size in sizes:
+            text = build(size)
+            started = time.perf_counter()
+            extract_json_array(text)
+            timings.append(time.perf_counter() - started)
+        growth = timings[-1] / max(timings[0], 1e-6)
+        expected = sizes[-1] / sizes[0]
+        ok = growth < expected * 4
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name:<20} " +
+              '  '.join(f"{size}: {timing * 1000:.2f}ms" for size, timing in zip(sizes, timings)))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzz extract_json_array")
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    failures = check_corpus(corpus)
+    failures += fuzz(corpus, args.iterations, random.Random(args.seed))
+    failures += check_linear([10_000, 100_000])
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""Load/latency benchmark against a local stub LLM server.
+
+Starts bench/stub_llm.py in a subprocess, points the recommendation system
+at it, serves app.py on a local port and drives each target at every
+concurrency level, reporting throughput and p50/p95/p99 latency. Results
+are written as JSON so runs can be compared release to release:
+
+    python bench/run_bench.py --concurrency 1,8,32 --requests 200 --output bench/results/new.json
+    python bench/run_bench.py --compare bench/results/old.json --output bench/results/new.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import asyncio
+import argparse
+import platform
+import threading
+import subprocess
+from typing import Dict, List, Optional
+
+import aiohttp
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from stub_llm import add_stub_arguments, base_urls  # noqa: E402
+
+TARGETS = ('http_recommend', 'http_find_with_ai', 'direct_recommend', 'direct_find_with_ai')
+
+QUERIES = [
+    "convert csv to pdf", "generate images from text", "edit videos automatically",
+    "write blog posts", "code completion for python", "design a logo", "compose background music",
+    "summarize long documents", "transcribe meeting audio", "clean up spreadsheet data",
+    "create ui mockups", "translate product descriptions", "remove image backgrounds",
+    "build a chatbot", "generate slide decks", "write unit tests"
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return round(sorted_values[index] * 1000, 2)
+
+
+def summarize(target: str, concurrency: int, samples: List[Dict], elapsed: float) -> Dict:
+    """Throughput and latency percentiles (ms) for one target/concurrency run"""
+    latencies = sorted(sample['latency'] for sample in samples if sample['ok'])
+    sources = {}
+    for sample in samples:
+        if sample.get('source'):
+            sources[sample['source']] = sources.get(sample['source'], 0) + 1
+    return {
+        'target': target,
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if not sample['ok']),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        'p50_ms': percentile(latencies, 0.5),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        'sources': sources
+    }
+
+
+def start_stub(args, port: int) -> subprocess.Popen:
+    """Launch the stub server with the same fault/latency options and wait until it answers"""
+    command = [sys.executable, os.path.join(BENCH_DIR, 'stub_llm.py'), '--port', str(port),
+               '--latency', args.latency, '--error-rate', str(args.error_rate),
+               '--malformed-rate', str(args.malformed_rate), '--fenced-rate', str(args.fenced_rate),
+               '--seed', str(args.seed)]
+    for override in args.provider_latency or []:
+        command += ['--provider-latency', override]
+    process = subprocess.Popen(command)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Stub LLM server did not start")
+
+
+def configure_environment(stub_port: int, with_cache: bool) -> None:
+    """Point the system at the stub and, unless measuring caches, disable them"""
+    os.environ.update(base_urls('127.0.0.1', stub_port))
+    for key in ('GITHUB_TOKEN', 'OPENAI_API_KEY', 'ANTHROPIC_API_KEY', 'DEEPSEEK_API_KEY'):
+        os.environ[key] = 'bench-stub-key'
+    # Stub tool links are placeholders; don't probe them
+    os.environ['LINK_VERIFY'] = 'off'
+    os.environ['QUERY_LOG_PATH'] = ''
+    # Circuits opened by an earlier run (or a local server) must not skip providers here,
+    # and a developer's .env rate limits would turn a throughput run into a shed count
+    os.environ['HEALTH_STATE_PATH'] = ''
+    os.environ['PROVIDER_RATE_LIMITS'] = ''
+    if not with_cache:
+        os.environ['CACHE_PATH'] = ''
+        os.environ['CACHE_TTL_SECONDS'] = '0'
+        os.environ['SEMANTIC_CACHE'] = 'false'
+
+
+def serve_app(app, port: int):
+    """Serve the Flask app on a background thread with the threaded WSGI server"""
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-app', daemon=True).start()
+    return server
+
+
+async def drive(call, concurrency: int, requests: int) -> List[Dict]:
+    """Issue `requests` calls from `concurrency` workers and time each one"""
+    samples = []
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            query = QUERIES[i % len(QUERIES)]
+            started = time.perf_counter()
+            try:
+                result = await call(query)
+                ok = isinstance(result, dict) and 'error' not in result
+                source = result.get('source') if isinstance(result, dict) else None
+            except Exception:
+                ok, source = False, None
+            samples.append({'latency': time.perf_counter() - started, 'ok': ok, 'source': source})
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+def make_callers(system, session: aiohttp.ClientSession, app_url: str) -> Dict:
+    async def http_post(path: str, query: str) -> Dict:
+        async with session.post(f"{app_url}{path}", json={'query': query}) as response:
+            result = await response.json()
+            return result if response.status == 200 else {'error': result}
+
+    return {
+        'http_recommend': lambda query: http_post('/recommend', query),
+        'http_find_with_ai': lambda query: http_post('/find-with-ai', query),
+        'direct_recommend': lambda query: system.runtime.wrap(system.recommend_tools_async(query)),
+        'direct_find_with_ai': lambda query: system.runtime.wrap(system.find_with_ai_async(query))
+    }
+
+
+async def run_suite(system, app_url: str, targets: List[str], levels: List[int], requests: int,
+                    warmup: int) -> List[Dict]:
+    results = []
+    connector = aiohttp.TCPConnector(limit=max(levels))
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as session:
+        callers = make_callers(system, session, app_url)
+        for target in targets:
+            await drive(callers[target], min(warmup, max(levels)), warmup)
+            for concurrency in levels:
+                started = time.perf_counter()
+                samples = await drive(callers[target], concurrency, requests)
+                summary = summarize(target, concurrency, samples, time.perf_counter() - started)
+                results.append(summary)
+                print(f"📊 {target:<20} c={concurrency:<4} {summary['throughput_rps']:>8} req/s  "
+                      f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms "
+                      f"errors={summary['errors']}", file=sys.__stdout__)
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path: str, results: List[Dict]) -> None:
+    """Print throughput and latency deltas against an earlier results file"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(run['target'], run['concurrency']): run for run in json.load(f)['results']}
+    print(f"\n📈 Compared with {baseline_path}", file=sys.__stdout__)
+    for run in results:
+        old = baseline.get((run['target'], run['concurrency']))
+        if old is None:
+            continue
+        deltas = []
+        for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            if old.get(metric) and run.get(metric) is not None:
+                deltas.append(f"{metric} {(run[metric] - old[metric]) / old[metric]:+.1%}")
+        print(f"   {run['target']:<20} c={run['concurrency']:<4} " + '  '.join(deltas), file=sys.__stdout__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation system against a stub LLM server")
+    parser.add_argument('--targets', default=','.join(TARGETS), help=f"Comma-separated subset of {TARGETS}")
+    parser.add_argument('--concurrency', default='1,8,32', help="Comma-separated concurrency levels")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per target and concurrency level")
+    parser.add_argument('--warmup', type=int, default=10, help="Unmeasured requests per target")
+    parser.add_argument('--with-cache', action='store_true', help="Keep result caches enabled")
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results', 'latest.json'))
+    parser.add_argument('--compare', help="Earlier results file to diff against")
+    parser.add_argument('--verbose', action='store_true', help="Show the app's own log output")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    targets = [target.strip() for target in args.targets.split(',') if target.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"Unknown targets: {sorted(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    stub_port, app_port = free_port(), free_port()
+    stub = start_stub(args, stub_port)
+    try:
+        configure_environment(stub_port, args.with_cache)
+        if not args.verbose:
+            sys.stdout = open(os.devnull, 'w')
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        # Imported only now, so the module-level app is built with the stub environment
+        from app import app
+        system = app.extensions['ai_tools']
+        server = serve_app(app, app_port)
+        try:
+            results = asyncio.run(run_suite(system, f"http://127.0.0.1:{app_port}", targets, levels,
+                                            args.requests, args.warmup))
+        finally:
+            server.shutdown()
+            system.close()
+    finally:
+        stub.terminate()
+        stub.wait()
+        sys.stdout = sys.__stdout__
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'verbose')},
+        'results': results
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {args.output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Build the local search index over a synthetic Zipf-distributed catalog and report
+build time, memory and query latency at catalog scale, and how far the capped
+threshold-algorithm top-5 matches a full scan.
+
+    python bench/search_scale.py --tools 100000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import itertools
+import resource
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from catalog import ToolRecord  # noqa: E402
+from search_index import ToolSearchIndex  # noqa: E402
+
+QUERIES = ['w1x w2x', 'w3x', 'w10x w50x w200x', 'w5000x', 'w7x w9000x', 'w1xx', 'w12', 'convert csv to pdf']
+
+
+def rss_mb() -> float:
+    """Peak resident set size of this process in MB (Linux reports KB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_records(count: int, vocabulary: int, rng: random.Random):
+    words = [f'w{i}x' for i in range(1, vocabulary + 1)]
+    cumulative = list(itertools.accumulate(1 / rank for rank in range(1, vocabulary + 1)))
+    categories = [f'category_{i}' for i in range(40)]
+    for i in range(count):
+        name = ' '.join(rng.choices(words, cum_weights=cumulative, k=2))
+        description = ' '.join(rng.choices(words, cum_weights=cumulative, k=rng.randint(8, 20)))
+        yield ToolRecord(f'{name} {i}', f'https://example.com/{i}', description, rng.choice(categories))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local search index at catalog scale")
+    parser.add_argument('--tools', type=int, default=100000)
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    records = list(make_records(args.tools, args.vocabulary, random.Random(7)))
+    before = rss_mb()
+    started = time.perf_counter()
+    index = ToolSearchIndex.from_records(records)
+    print(f"🏗️  {args.tools} tools indexed in {time.perf_counter() - started:.2f}s, "
+          f"peak RSS {before:.0f} MB -> {rss_mb():.0f} MB")
+    failures = 0
+    for query in QUERIES:
+        index.search(query, k=5, prefix=True, fuzzy=True)  # warm-up
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            results = index.search(query, k=5, prefix=True, fuzzy=True)
+        elapsed = (time.perf_counter() - started) / args.repeat * 1000
+        # The threshold algorithm must rank exactly like a scan of every posting
+        depth, index.scan_depth = index.scan_depth, args.tools
+        full = index.search(query, k=5, prefix=True, fuzzy=True)
+        index.scan_depth = depth
+        exact = [round(score, 4) for score, _ in results] == [round(score, 4) for score, _ in full]
+        failures += not exact
+        print(f"{'🔎' if exact else '❌'} {query!r:<22} {elapsed:8.3f}ms  "
+              f"top: {[doc.name for _, doc in results[:2]]}")
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
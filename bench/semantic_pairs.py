@@ -0,0 +1,74 @@
+"""Check the semantic cache against query pairs that must (or must not) share a result,
+and time a lookup at the exact-scan limit.
+
+    python bench/semantic_pairs.py
+"""
+import os
+import sys
+import time
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from semantic_cache import SemanticCache  # noqa: E402
+
+# (cached query, later query)
+SAME = [
+    ("convert csv to pdf", "turn my CSV into a PDF"),
+    ("convert csv to pdf", "csv → pdf converter"),
+    ("text to speech", "text to speech free"),
+]
+DIFFERENT = [
+    ("text to speech", "speech to text"),
+    ("video to audio", "audio to video"),
+    ("english to spanish", "spanish to english"),
+    ("text to image", "image to text"),
+    ("convert csv to pdf", "pdf to csv"),
+    ("youtube video summarizer", "youtube video downloader"),
+    ("convert csv to pdf", "convert csv to excel"),
+    ("image generator", "video generator"),
+    ("remove background from image", "remove background from video"),
+    ("transcribe audio to text", "transcribe video to text"),
+    ("c code assistant", "c++ code assistant"),
+    ("c code assistant", "c# code assistant"),
+]
+
+
+def check_pairs(threshold: float) -> int:
+    failures = 0
+    for expected, pairs in ((True, SAME), (False, DIFFERENT)):
+        for cached, later in pairs:
+            cache = SemanticCache(max_size=16, threshold=threshold)
+            cache.set('pairs', cached, {'query': cached})
+            score = float(cache.vectorizer.vectorize(cached) @ cache.vectorizer.vectorize(later))
+            hit = cache.get('pairs', later) is not None
+            ok = hit == expected
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {'hit ' if hit else 'miss'} {score:.2f}  {cached!r} -> {later!r}")
+    return failures
+
+
+def time_lookup(entries: int, lookups: int = 200) -> float:
+    cache = SemanticCache(max_size=entries, exact_scan_limit=entries)
+    for i in range(entries):
+        cache.set('bench', f"stand-in query {i} for tool {i * 7919 % 100003}", {'i': i})
+    started = time.perf_counter()
+    for _ in range(lookups):
+        cache.get('bench', 'an unrelated query about something else')
+    return (time.perf_counter() - started) / lookups * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic cache accuracy and lookup time")
+    parser.add_argument('--threshold', type=float, default=0.75)
+    parser.add_argument('--entries', type=int, default=20000, help="entries for the lookup timing")
+    args = parser.parse_args()
+
+    failures = check_pairs(args.threshold)
+    print(f"⏱️  Lookup with {args.entries} entries: {time_lookup(args.entries):.3f}ms")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
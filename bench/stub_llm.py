@@ -0,0 +1,196 @@
+"""Local stand-in for the GitHub Models, OpenAI, Anthropic and DeepSeek APIs.
+
+Each provider is mounted under its own prefix and answers with that
+provider's response schema, after a latency drawn from a configurable
+distribution. A fraction of responses can be HTTP errors, malformed JSON or
+JSON wrapped in markdown fences, so the fallback and parsing paths get
+exercised too.
+
+    python bench/stub_llm.py --port 8900 --latency lognormal:0.4:0.5 --error-rate 0.05
+
+Point the app at it with GITHUB_API_BASE=http://127.0.0.1:8900/github,
+OPENAI_API_BASE=http://127.0.0.1:8900/openai/v1 and so on (run_bench.py
+does this for you).
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Callable, Dict, List
+
+from aiohttp import web
+
+PROVIDERS = ('github', 'openai', 'anthropic', 'deepseek')
+
+
+def base_urls(host: str, port: int) -> Dict[str, str]:
+    """Environment variables that point AIToolRecommendationSystem at a stub on host:port"""
+    root = f"http://{host}:{port}"
+    return {
+        'GITHUB_API_BASE': f"{root}/github",
+        'OPENAI_API_BASE': f"{root}/openai/v1",
+        'ANTHROPIC_API_BASE': f"{root}/anthropic/v1",
+        'DEEPSEEK_API_BASE': f"{root}/deepseek/v1"
+    }
+
+
+def parse_latency(spec: str, rng: random.Random) -> Callable[[], float]:
+    """Build a latency sampler (seconds) from 'fixed:S', 'uniform:LO:HI',
+    'normal:MEAN:STD' or 'lognormal:MEDIAN:SIGMA'"""
+    kind, _, params = spec.partition(':')
+    values = [float(value) for value in params.split(':') if value]
+    if kind == 'fixed' and len(values) == 1:
+        return lambda: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == 'normal' and len(values) == 2:
+        return lambda: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == 'lognormal' and len(values) == 2:
+        median, sigma = values
+        return lambda: median * rng.lognormvariate(0, sigma)
+    raise ValueError(f"Invalid latency spec '{spec}'")
+
+
+class StubLLM:
+    """Generates provider responses with the configured latency and fault mix"""
+
+    def __init__(self, latency: str = 'fixed:0.2', error_rate: float = 0.0, malformed_rate: float = 0.0,
+                 fenced_rate: float = 0.3, provider_latency: Dict[str, str] = None, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.default_latency = parse_latency(latency, self.rng)
+        self.latency = {provider: parse_latency(spec, self.rng) for provider, spec in (provider_latency or {}).items()}
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.fenced_rate = fenced_rate
+        self.stats = {provider: {'requests': 0, 'errors': 0, 'malformed': 0, 'fenced': 0} for provider in PROVIDERS}
+
+    def tools(self, compact: bool = False) -> List[Dict]:
+        picks = self.rng.sample(range(1000), 5)
+        keys = ('n', 'u', 'd') if compact else ('name', 'link', 'description')
+        return [
+            dict(zip(keys, (f"Stub Tool {n}", f"https://example.com/tools/{n}", f"Benchmark stand-in tool number {n}.")))
+            for n in picks
+        ]
+
+    def content(self, provider: str, compact: bool = False) -> str:
+        """The completion text: a JSON tool list, possibly fenced or malformed"""
+        text = json.dumps(self.tools(compact), indent=2)
+        roll = self.rng.random()
+        if roll < self.malformed_rate:
+            self.stats[provider]['malformed'] += 1
+            return 'Here are some tools: ' + text[:len(text) // 2]
+        if roll < self.malformed_rate + self.fenced_rate:
+            self.stats[provider]['fenced'] += 1
+            return f"```json\n{text}\n```"
+        return text
+
+    async def delay(self, provider: str) -> None:
+        await asyncio.sleep(self.latency.get(provider, self.default_latency)())
+
+    def error_response(self, provider: str):
+        """An HTTP error for this request, or None"""
+        if self.rng.random() >= self.error_rate:
+            return None
+        self.stats[provider]['errors'] += 1
+        if self.rng.random() < 0.5:
+            return web.json_response({'error': {'message': 'rate limited'}}, status=429, headers={'Retry-After': '1'})
+        return web.json_response({'error': {'message': 'stub upstream failure'}}, status=500)
+
+    def handler(self, provider: str):
+        async def handle(request: web.Request) -> web.StreamResponse:
+            self.stats[provider]['requests'] += 1
+            body = await request.json()
+            await self.delay(provider)
+            error = self.error_response(provider)
+            if error is not None:
+                return error
+            messages = body.get('messages') or []
+            # Answer in the compact schema when the prompt asks for it
+            compact = any('"n":' in str(message.get('content', '')) for message in messages if isinstance(message, dict))
+            content = self.content(provider, compact)
+            # Rough token counts (~4 characters per token) so usage accounting has data
+            prompt_tokens = len(json.dumps(messages) + str(body.get('system', ''))) // 4
+            truncated = isinstance(body.get('max_tokens'), int) and len(content) // 4 > body['max_tokens']
+            if truncated:
+                content = content[:body['max_tokens'] * 4]
+            completion_tokens = len(content) // 4
+            if provider == 'anthropic':
+                return web.json_response({
+                    'id': 'msg_stub', 'type': 'message', 'role': 'assistant', 'model': body.get('model'),
+                    'content': [{'type': 'text', 'text': content}], 'stop_reason': 'max_tokens' if truncated else 'end_turn',
+                    'usage': {'input_tokens': prompt_tokens, 'output_tokens': completion_tokens}
+                })
+            if body.get('stream'):
+                return await self.stream(request, body, content)
+            return web.json_response({
+                'id': 'chatcmpl-stub', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': body.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'length' if truncated else 'stop'}],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                          'total_tokens': prompt_tokens + completion_tokens}
+            })
+        return handle
+
+    async def stream(self, request: web.Request, body: Dict, content: str) -> web.StreamResponse:
+        """Send the completion as OpenAI-style server-sent event chunks"""
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        for i in range(0, len(content), 24):
+            chunk = {'model': body.get('model'), 'choices': [{'index': 0, 'delta': {'content': content[i:i + 24]}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            await asyncio.sleep(0.005)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/github/chat/completions', self.handler('github'))
+        app.router.add_post('/openai/v1/chat/completions', self.handler('openai'))
+        app.router.add_post('/anthropic/v1/messages', self.handler('anthropic'))
+        app.router.add_post('/deepseek/v1/chat/completions', self.handler('deepseek'))
+        app.router.add_get('/stats', lambda request: web.json_response(self.stats))
+        return app
+
+
+def parse_provider_latency(values: List[str]) -> Dict[str, str]:
+    """Parse repeated PROVIDER=SPEC options"""
+    overrides = {}
+    for value in values or []:
+        provider, _, spec = value.partition('=')
+        if provider not in PROVIDERS or not spec:
+            raise ValueError(f"Invalid provider latency '{value}', expected e.g. github=fixed:0.5")
+        overrides[provider] = spec
+    return overrides
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--latency', default='lognormal:0.3:0.5',
+                        help="Latency distribution: fixed:S, uniform:LO:HI, normal:MEAN:STD or lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--provider-latency', action='append', metavar='PROVIDER=SPEC',
+                        help="Per-provider latency override, e.g. github=fixed:1.5 (repeatable)")
+    parser.add_argument('--error-rate', type=float, default=0.02, help="Fraction of 429/500 responses")
+    parser.add_argument('--malformed-rate', type=float, default=0.02, help="Fraction of truncated, unparseable completions")
+    parser.add_argument('--fenced-rate', type=float, default=0.3, help="Fraction of completions wrapped in ```json fences")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def stub_from_args(args) -> StubLLM:
+    return StubLLM(latency=args.latency, error_rate=args.error_rate, malformed_rate=args.malformed_rate,
+                   fenced_rate=args.fenced_rate, provider_latency=parse_provider_latency(args.provider_latency),
+                   seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub LLM provider server for benchmarks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    print(f"🧪 Stub LLM server on http://{args.host}:{args.port}")
+    web.run_app(stub_from_args(args).app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
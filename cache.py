@@ -0,0 +1,172 @@
+import re
+import json
+import time
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from shared_store import READ_BUSY_TIMEOUT, WriteBehind, open_shared_db
+
+logger = logging.getLogger(__name__)
+
+# '+' and '#' right after a word are part of it (c++, c#, f#); anywhere else they are punctuation
+_PUNCTUATION = re.compile(r'(?<![\w+#])[+#]+|[^\w\s+#]+|_')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(query: str) -> str:
+    """Fold case, punctuation and whitespace so equivalent queries share a key.
+
+    "C++", "C#" and "C" stay distinct: a '+' or '#' run attached to the end
+    of a word is kept.
+    """
+    folded = _PUNCTUATION.sub(' ', query.casefold())
+    return _WHITESPACE.sub(' ', folded).strip()
+
+
+class RecommendationCache:
+    """Two-tier result cache: bounded in-memory LRU with TTL over a SQLite file.
+
+    The SQLite tier runs in WAL mode so every worker process on a node can
+    share it: a result computed by one worker is a disk hit for the others.
+    The file is capped at `disk_max_size` rows, evicting the entries that
+    expire soonest. Disk writes are applied by a write-behind thread and
+    disk reads give up after a short busy timeout, so a worker holding the
+    file's lock never stalls the caller (typically the event loop thread).
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600, path: Optional[str] = None,
+                 disk_max_size: int = 100000):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.disk_max_size = disk_max_size
+        self._memory = OrderedDict()  # key -> (expires_at, payload)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        self._db = None
+        self._writer = None
+        self._writes = 0
+
+        if path:
+            self._writer = WriteBehind(path, schema=(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)",
+                "CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)"
+            ), name='cache-writer')
+            self._db = open_shared_db(path, READ_BUSY_TIMEOUT)
+
+    @staticmethod
+    def make_key(namespace: str, query: str, provider: str) -> str:
+        """Build a cache key from the endpoint, normalized query and model/provider"""
+        return f"{namespace}|{provider}|{normalize_query(query)}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a cached result, checking memory first and then disk"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return json.loads(payload)
+                del self._memory[key]
+                self._stats['expirations'] += 1
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT payload, expires_at FROM cache WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.OperationalError as e:
+                    # The file was locked past the read timeout; treat as a miss
+                    logger.warning("Shared cache read failed: %s", e)
+                    row = None
+                if row and row[1] > now:
+                    self._store_in_memory(key, row[1], row[0])
+                    self._stats['hits'] += 1
+                    self._stats['disk_hits'] += 1
+                    return json.loads(row[0])
+
+            self._stats['misses'] += 1
+            return None
+
+    def expires_in(self, key: str) -> Optional[float]:
+        """Seconds until a cached entry expires, or None if it is missing; not counted in stats"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            expires_at = entry[0] if entry is not None else None
+            if expires_at is None and self._db is not None:
+                try:
+                    row = self._db.execute("SELECT expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+                except sqlite3.OperationalError:
+                    row = None
+                expires_at = row[0] if row else None
+        if expires_at is None or expires_at <= now:
+            return None
+        return expires_at - now
+
+    def set(self, key: str, value: Dict, ttl: Optional[float] = None) -> None:
+        """Store a result in both tiers"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        payload = json.dumps(value)
+        with self._lock:
+            self._store_in_memory(key, expires_at, payload)
+            if self._writer is None:
+                return
+            self._writes += 1
+            prune = self._writes % 500 == 0
+
+        def write(db: sqlite3.Connection) -> None:
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, payload, expires_at) VALUES (?, ?, ?)",
+                (key, payload, expires_at)
+            )
+            if prune:
+                self._prune_disk(db)
+
+        self._writer.submit(write)
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Wait for queued disk writes to land (for short-lived processes such as the CLI)"""
+        return self._writer.flush(timeout) if self._writer is not None else True
+
+    def _prune_disk(self, db: sqlite3.Connection) -> None:
+        """Drop expired rows, then the soonest-expiring ones beyond disk_max_size"""
+        db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        excess = db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.disk_max_size
+        if excess > 0:
+            db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at LIMIT ?)", (excess,)
+            )
+            with self._lock:
+                self._stats['evictions'] += excess
+
+    def _store_in_memory(self, key: str, expires_at: float, payload: str) -> None:
+        self._memory[key] = (expires_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def stats(self) -> Dict:
+        """Return hit/miss/eviction counters and the current memory size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._memory)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        if self._writer is not None:
+            self._writer.submit(lambda db: db.execute("DELETE FROM cache"))
+            self._writer.flush()
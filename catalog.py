@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from search_index import ToolSearchIndex
+
+logger = logging.getLogger(__name__)
+
+
+class ToolRecord:
+    """Compact catalog entry; category strings are interned and shared"""
+
+    __slots__ = ('name', 'link', 'description', 'category')
+
+    def __init__(self, name: str, link: str, description: str, category: str):
+        self.name = name
+        self.link = link
+        self.description = description
+        self.category = category
+
+    def to_dict(self) -> Dict:
+        return {'name': self.name, 'link': self.link, 'description': self.description}
+
+
+class CatalogSnapshot:
+    """Immutable view of one version of the catalog file"""
+
+    def __init__(self, records: List[ToolRecord], mtime: float,
+                 category_keywords: Optional[Dict[str, Iterable[str]]] = None):
+        self.records = tuple(records)
+        self.mtime = mtime
+        self.category_keywords = category_keywords or {}
+        self._by_category: Dict[str, List[ToolRecord]] = {}
+        for record in self.records:
+            self._by_category.setdefault(record.category, []).append(record)
+        self._search_index = None
+        self._as_dict = None
+        self._lock = threading.Lock()
+
+    def category(self, name: str) -> List[ToolRecord]:
+        return self._by_category.get(name, [])
+
+    @property
+    def search_index(self) -> ToolSearchIndex:
+        """Inverted index over this snapshot, built on first use"""
+        if self._search_index is None:
+            with self._lock:
+                if self._search_index is None:
+                    self._search_index = ToolSearchIndex.from_records(self.records, self.category_keywords)
+        return self._search_index
+
+    def as_dict(self) -> Dict[str, List[Dict]]:
+        """The catalog as {category: [tool dict, ...]}, materialized on first use"""
+        if self._as_dict is None:
+            self._as_dict = {
+                category: [record.to_dict() for record in records]
+                for category, records in self._by_category.items()
+            }
+        return self._as_dict
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+def load_records(path: str) -> List[ToolRecord]:
+    """Parse a JSONL catalog with one {category, name, link, description} object per line"""
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                records.append(ToolRecord(
+                    item['name'],
+                    item['link'],
+                    item.get('description', ''),
+                    sys.intern(item.get('category', 'uncategorized'))
+                ))
+            except (ValueError, KeyError) as e:
+                logger.warning("Skipping catalog line %d: %s", line_number, e)
+    return records
+
+
+class ToolCatalog:
+    """Lazily loaded tool catalog that hot-reloads when its file changes.
+
+    A missing file is logged as an error and loads as an empty catalog; if the
+    file disappears after it was loaded, the last snapshot is kept.
+    """
+
+    def __init__(self, path: str, reload_interval: float = 5.0,
+                 category_keywords: Optional[Dict[str, Iterable[str]]] = None):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.category_keywords = category_keywords
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._load_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._next_check = 0.0
+        self._missing_logged = False
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Return the current snapshot, loading it on first use"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load()
+                    self._next_check = time.monotonic() + self.reload_interval
+                return self._snapshot
+        if self.reload_interval > 0 and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.reload_interval
+            self._maybe_reload(snapshot)
+        return snapshot
+
+    def preload(self) -> threading.Thread:
+        """Load the snapshot and build its search index in a background thread;
+        requests arriving meanwhile wait for the load instead of starting their own"""
+        def load():
+            try:
+                self.snapshot().search_index
+            except Exception as e:
+                logger.error("Catalog preload failed: %s", e)
+
+        thread = threading.Thread(target=load, name='catalog-preload', daemon=True)
+        thread.start()
+        return thread
+
+    def _mtime(self) -> float:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return 0.0
+
+    def _missing(self) -> None:
+        """Log a missing catalog file once per disappearance, not on every check"""
+        if not self._missing_logged:
+            self._missing_logged = True
+            logger.error("Tool catalog file not found: %s", os.path.abspath(self.path))
+
+    def _load(self) -> CatalogSnapshot:
+        mtime = self._mtime()
+        if mtime:
+            self._missing_logged = False
+            records = load_records(self.path)
+        else:
+            self._missing()
+            records = []
+        return CatalogSnapshot(records, mtime, self.category_keywords)
+
+    def _maybe_reload(self, current: CatalogSnapshot) -> None:
+        """Rebuild in a background thread; readers keep the old snapshot until the swap"""
+        mtime = self._mtime()
+        if mtime == current.mtime:
+            return
+        if not mtime:
+            # Deleted or mid-replace: serving the last good catalog beats serving none
+            self._missing()
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return
+
+        def reload():
+            try:
+                snapshot = self._load()
+                snapshot.search_index  # build before publishing so no request pays for it
+                self._snapshot = snapshot
+                logger.info("Reloaded tool catalog: %d tools", len(snapshot))
+            except Exception as e:
+                logger.error("Catalog reload failed, keeping previous version: %s", e)
+            finally:
+                self._reload_lock.release()
+
+        threading.Thread(target=reload, name='catalog-reload', daemon=True).start()
+
+    def reload(self) -> CatalogSnapshot:
+        """Synchronously reload the catalog file; a missing file keeps the loaded snapshot"""
+        with self._reload_lock:
+            if self._snapshot is not None and not self._mtime():
+                self._missing()
+            else:
+                self._snapshot = self._load()
+        return self._snapshot
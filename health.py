@@ -0,0 +1,248 @@
+import time
+import logging
+import sqlite3
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from shared_store import READ_BUSY_TIMEOUT, WriteBehind, open_shared_db
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+logger = logging.getLogger(__name__)
+
+
+class HealthWindow:
+    """Rolling window of recent call outcomes plus a circuit breaker for one provider or model"""
+
+    def __init__(self, size: int, max_age: float):
+        self.max_age = max_age
+        self.calls = deque(maxlen=size)  # (timestamp, latency, ok)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.changed_at = 0.0  # wall-clock time of the last open/close, for merging with other workers
+        self.probe_started: Optional[float] = None
+
+    def prune(self, now: float) -> None:
+        while self.calls and now - self.calls[0][0] > self.max_age:
+            self.calls.popleft()
+
+    def error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for _, _, ok in self.calls if not ok) / len(self.calls)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        latencies = sorted(latency for _, latency, ok in self.calls if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(percentile * len(latencies)))
+        return latencies[index]
+
+
+class SharedCircuitStore:
+    """Circuit open/close transitions shared by every worker process on a node.
+
+    Transitions are written to a SQLite WAL file by a write-behind thread;
+    readers reload the whole (small) table at most once per
+    `refresh_interval` with a short busy timeout, so checking a circuit
+    never waits on another worker's write.
+    """
+
+    def __init__(self, path: str, refresh_interval: float = 1.0):
+        self.refresh_interval = refresh_interval
+        self._writer = WriteBehind(path, schema=(
+            "CREATE TABLE IF NOT EXISTS circuits ("
+            "key TEXT PRIMARY KEY, state TEXT NOT NULL, changed_at REAL NOT NULL)",
+        ), name='circuit-writer')
+        self._db = open_shared_db(path, READ_BUSY_TIMEOUT)
+        self._lock = threading.Lock()
+        self._states: Dict[str, Tuple[str, float]] = {}
+        self._loaded_at = float('-inf')
+
+    def publish(self, key: str, state: str, changed_at: float) -> None:
+        """Record a transition unless another worker already recorded a newer one"""
+        with self._lock:
+            self._states = {**self._states, key: (state, changed_at)}
+        self._writer.submit(lambda db: db.execute(
+            "INSERT INTO circuits (key, state, changed_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET state = excluded.state, changed_at = excluded.changed_at "
+            "WHERE excluded.changed_at > circuits.changed_at",
+            (key, state, changed_at)
+        ))
+
+    def states(self) -> Dict[str, Tuple[str, float]]:
+        """Latest (state, changed_at) per key across all workers"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._loaded_at >= self.refresh_interval:
+                self._loaded_at = now
+                try:
+                    rows = self._db.execute("SELECT key, state, changed_at FROM circuits").fetchall()
+                    self._states = {key: (state, changed_at) for key, state, changed_at in rows}
+                except sqlite3.OperationalError as e:
+                    logger.warning("Shared circuit read failed: %s", e)
+            return self._states
+
+
+class ProviderHealth:
+    """Tracks latency and errors per provider and per model.
+
+    A circuit opens after `consecutive_failures` failures in a row, or when the
+    error rate over the window passes `error_threshold` with at least
+    `min_requests` samples. Open circuits are skipped for `cooldown` seconds,
+    then a single probe call decides whether to close them again. Timeouts are
+    derived from observed latency percentiles instead of a constant.
+
+    With a `store`, circuits opened or closed by one worker process apply to
+    every worker sharing the store; latency windows stay per process.
+    """
+
+    def __init__(self, window_size: int = 50, window_seconds: float = 300, error_threshold: float = 0.5,
+                 min_requests: int = 5, consecutive_failures: int = 3, cooldown: float = 30,
+                 default_timeout: float = 30, min_timeout: float = 2, max_timeout: float = 30,
+                 timeout_percentile: float = 0.95, timeout_multiplier: float = 2.0, min_samples: int = 5,
+                 store: Optional[SharedCircuitStore] = None):
+        self.window_size = window_size
+        self.window_seconds = window_seconds
+        self.error_threshold = error_threshold
+        self.min_requests = min_requests
+        self.consecutive_failures = consecutive_failures
+        self.cooldown = cooldown
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_percentile = timeout_percentile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+        self.store = store
+        self._windows: Dict[str, HealthWindow] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def keys(provider: str, model: Optional[str] = None):
+        return (provider,) if model is None else (provider, f"{provider}:{model}")
+
+    def _window(self, key: str) -> HealthWindow:
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = HealthWindow(self.window_size, self.window_seconds)
+        return window
+
+    @staticmethod
+    def _transition(key: str, window: HealthWindow, state: str, now: float) -> Tuple[str, str, float]:
+        """Change a circuit's state; returns the transition to publish once the lock is released"""
+        window.state = state
+        window.changed_at = time.time()
+        if state == OPEN:
+            window.opened_at = now
+        return key, state, window.changed_at
+
+    def _merge_shared(self, keys: Tuple[str, ...], shared: Dict[str, Tuple[str, float]], now: float) -> None:
+        """Adopt open/close transitions that other workers made more recently than ours"""
+        wall_now = time.time()
+        for key in keys:
+            entry = shared.get(key)
+            if entry is None:
+                continue
+            state, changed_at = entry
+            window = self._window(key)
+            if changed_at <= window.changed_at:
+                continue
+            window.changed_at = changed_at
+            if state == OPEN:
+                window.state = OPEN
+                window.opened_at = now - (wall_now - changed_at)
+            elif window.state != CLOSED:
+                window.state = CLOSED
+                window.consecutive_failures = 0
+
+    def allow(self, provider: str, model: Optional[str] = None) -> bool:
+        """Whether a call may go out; False while the provider's or model's circuit is open"""
+        now = time.monotonic()
+        shared = self.store.states() if self.store is not None else None
+        with self._lock:
+            if shared:
+                self._merge_shared(self.keys(provider, model), shared, now)
+            windows = [self._windows[key] for key in self.keys(provider, model) if key in self._windows]
+            for window in windows:
+                if window.state == OPEN and now - window.opened_at >= self.cooldown:
+                    window.state = HALF_OPEN
+                    window.probe_started = None
+            for window in windows:
+                if window.state == OPEN:
+                    return False
+                # One probe at a time; a probe that never reported back (e.g. cancelled) expires
+                if (window.state == HALF_OPEN and window.probe_started is not None and
+                        now - window.probe_started < self.max_timeout):
+                    return False
+            for window in windows:
+                if window.state == HALF_OPEN:
+                    window.probe_started = now
+            return True
+
+    def record(self, provider: str, latency: float, ok: bool, model: Optional[str] = None) -> None:
+        """Record one call's outcome and update circuit state"""
+        now = time.monotonic()
+        transitions = []
+        with self._lock:
+            for key in self.keys(provider, model):
+                window = self._window(key)
+                window.prune(now)
+                window.calls.append((now, latency, ok))
+                window.probe_started = None
+                if ok:
+                    window.consecutive_failures = 0
+                    if window.state != CLOSED:
+                        transitions.append(self._transition(key, window, CLOSED, now))
+                        logger.info("Circuit closed for %s", key)
+                    continue
+                window.consecutive_failures += 1
+                tripped = (
+                    window.state == HALF_OPEN or
+                    window.consecutive_failures >= self.consecutive_failures or
+                    (len(window.calls) >= self.min_requests and window.error_rate() >= self.error_threshold)
+                )
+                if tripped and window.state != OPEN:
+                    transitions.append(self._transition(key, window, OPEN, now))
+                    logger.warning("Circuit opened for %s for %ss", key, self.cooldown)
+        if self.store is not None:
+            for transition in transitions:
+                self.store.publish(*transition)
+
+    def timeout_for(self, provider: str, model: Optional[str] = None) -> float:
+        """Timeout from the model's (or else the provider's) observed latency percentile"""
+        with self._lock:
+            for key in reversed(self.keys(provider, model)):
+                window = self._windows.get(key)
+                if window is None:
+                    continue
+                window.prune(time.monotonic())
+                if sum(1 for call in window.calls if call[2]) >= self.min_samples:
+                    observed = window.latency_percentile(self.timeout_percentile)
+                    return min(self.max_timeout, max(self.min_timeout, observed * self.timeout_multiplier))
+        return self.default_timeout
+
+    def latency_percentile(self, provider: str, percentile: float, model: Optional[str] = None) -> Optional[float]:
+        """Observed latency percentile for a model (or provider), None without data"""
+        key = self.keys(provider, model)[-1]
+        with self._lock:
+            window = self._windows.get(key)
+            return window.latency_percentile(percentile) if window else None
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Per-key state, error rate and latency percentiles"""
+        with self._lock:
+            return {
+                key: {
+                    'state': window.state,
+                    'calls': len(window.calls),
+                    'error_rate': round(window.error_rate(), 3),
+                    'p50': window.latency_percentile(0.5),
+                    'p95': window.latency_percentile(0.95)
+                }
+                for key, window in self._windows.items()
+            }
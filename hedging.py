@@ -0,0 +1,49 @@
+import threading
+from typing import Callable, Dict
+
+
+class HedgeBudget:
+    """Caps hedged (duplicate) upstream calls to a fraction of primary calls.
+
+    Every primary request earns `ratio` tokens, up to `burst`; firing a hedge
+    spends one. With ratio=0.1 hedging adds at most ~10% extra upstream calls.
+    Also counts how often hedges fire, win and are denied.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 10):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'hedges_fired': 0, 'hedges_won': 0, 'hedges_denied': 0}
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._stats['requests'] += 1
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_hedge(self, launch: Callable[[], bool]) -> bool:
+        """Fire one hedge if the budget allows it: call `launch`, and spend a token only
+        if it actually started a call (it returns False when nothing could be launched)"""
+        with self._lock:
+            if self._tokens < 1:
+                self._stats['hedges_denied'] += 1
+                return False
+            if not launch():
+                return False
+            self._tokens -= 1
+            self._stats['hedges_fired'] += 1
+            return True
+
+    def record_win(self) -> None:
+        with self._lock:
+            self._stats['hedges_won'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['tokens'] = round(self._tokens, 2)
+        fired = stats['hedges_fired']
+        stats['win_rate'] = stats['hedges_won'] / fired if fired else 0.0
+        stats['extra_call_rate'] = fired / stats['requests'] if stats['requests'] else 0.0
+        return stats
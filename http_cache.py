@@ -0,0 +1,90 @@
+import gzip
+import json
+import hashlib
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli not installed: gzip only
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them saves less than the headers cost
+MIN_COMPRESS_SIZE = 512
+
+
+def json_body(result: Dict) -> bytes:
+    """Serialize a result the same way every time, so equal results have equal ETags"""
+    return json.dumps(result, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def strong_etag(body: bytes) -> str:
+    """Opaque tag for the uncompressed body (without quotes)"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """Quoted ETag header value; each content coding gets its own tag, as strong
+    validators must differ between byte-different representations"""
+    return f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether If-None-Match names this resource's body in any content coding"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate.strip('"').split('-', 1)[0] == etag:
+            return True
+    return False
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """Content codings from an Accept-Encoding header with their q-values"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Iterable[str] = None) -> Optional[str]:
+    """Pick br or gzip from Accept-Encoding (preferring br on a tie), or None for identity"""
+    if not accept_encoding:
+        return None
+    if available is None:
+        available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Compress a body with the negotiated coding; small bodies stay uncompressed"""
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(body, quality=5), 'br'
+    if encoding == 'gzip':
+        # mtime=0 keeps the output byte-identical for identical bodies
+        return gzip.compress(body, compresslevel=6, mtime=0), 'gzip'
+    return body, None
@@ -0,0 +1,225 @@
+import json
+import time
+import random
+import asyncio
+import contextvars
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, List, Mapping, Optional
+
+import aiohttp
+
+from ratelimit import TokenBucket
+
+
+# Upstream requests sent from the current context, for callers that budget them (cache warm-up)
+_REQUEST_TALLY: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar('request_tally', default=None)
+
+
+def count_requests() -> List[int]:
+    """Count provider requests, retries included, made from the current context and
+    tasks started from it; returns the live one-item tally"""
+    tally = [0]
+    _REQUEST_TALLY.set(tally)
+    return tally
+
+
+class RetryPolicy:
+    """Jittered exponential backoff for 429/5xx responses that honours Retry-After"""
+
+    def __init__(self, max_retries: int = 2, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 retry_statuses=(429, 500, 502, 503, 504)):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def should_retry(self, status_code: Optional[int], attempt: int) -> bool:
+        """Retry transport errors (status None) and retryable statuses until the budget runs out"""
+        if attempt >= self.max_retries:
+            return False
+        return status_code is None or status_code in self.retry_statuses
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None if Retry-After asks for too long"""
+        requested = self.parse_retry_after(retry_after)
+        if requested is not None:
+            return requested if requested <= self.backoff_max else None
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Parse a Retry-After header given either as seconds or as an HTTP date"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class ProviderResponse:
+    """Fully read upstream response, detached from the connection it came from"""
+
+    __slots__ = ('status_code', 'headers', 'text')
+
+    def __init__(self, status_code: int, headers: Mapping[str, str], text: str):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class ProviderHTTPError(Exception):
+    """Non-200 answer from a provider's streaming endpoint"""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"{status_code} - {text[:200]}")
+        self.status_code = status_code
+        self.text = text
+
+
+class ProviderSessions:
+    """Pooled keep-alive aiohttp sessions, one per provider, shared by every request.
+
+    Sessions are bound to the event loop they are first used on, so all calls
+    must come from the same loop (see async_runtime.AsyncRuntime).
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 3.05, read_timeout: float = 30,
+                 retry_policy: Optional[RetryPolicy] = None, keepalive_timeout: float = 30,
+                 rate_limits: Optional[Dict[str, float]] = None):
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.set_rate_limits(rate_limits or {})
+
+    def set_rate_limits(self, rate_limits: Dict[str, float]) -> None:
+        """Limit each named provider to the given requests per second"""
+        for provider, rate in rate_limits.items():
+            self._buckets[provider] = TokenBucket(rate)
+
+    async def _throttle(self, provider: str) -> None:
+        """Wait for the provider's rate limit before an attempt, and count the attempt"""
+        bucket = self._buckets.get(provider)
+        if bucket is not None:
+            await bucket.acquire()
+        tally = _REQUEST_TALLY.get()
+        if tally is not None:
+            tally[0] += 1
+
+    def session(self, provider: str) -> aiohttp.ClientSession:
+        """Return the provider's session, creating its connection pool on first use"""
+        session = self._sessions.get(provider)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._sessions[provider] = session
+        return session
+
+    def _attempt_timeout(self, deadline: Optional[float]) -> Optional[aiohttp.ClientTimeout]:
+        """Timeout for the next attempt: whatever is left of the call's deadline"""
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError("provider call deadline exceeded")
+        return aiohttp.ClientTimeout(total=remaining, sock_connect=min(remaining, self.timeout.sock_connect))
+
+    @staticmethod
+    def _fits(deadline: Optional[float], delay: Optional[float]) -> bool:
+        """Whether a backoff of `delay` still leaves time for another attempt"""
+        return delay is not None and (deadline is None or time.monotonic() + delay < deadline)
+
+    async def post(self, provider: str, url: str, timeout: Optional[float] = None, **kwargs) -> ProviderResponse:
+        """POST through the provider's pool, retrying transient failures with backoff.
+
+        `timeout` bounds the whole call, retries and backoff included. A
+        timed-out attempt is not retried: a hung upstream has already spent
+        the time, and another attempt would only multiply it.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        session = self.session(provider)
+        attempt = 0
+        while True:
+            await self._throttle(provider)
+            attempt_timeout = self._attempt_timeout(deadline)
+            if attempt_timeout is not None:
+                kwargs['timeout'] = attempt_timeout
+            try:
+                async with session.post(url, **kwargs) as response:
+                    result = ProviderResponse(response.status, response.headers, await response.text())
+            except asyncio.TimeoutError:
+                raise
+            except aiohttp.ClientConnectionError:
+                delay = self.retry_policy.delay(attempt)
+                if not self.retry_policy.should_retry(None, attempt) or not self._fits(deadline, delay):
+                    raise
+            else:
+                if not self.retry_policy.should_retry(result.status_code, attempt):
+                    return result
+                delay = self.retry_policy.delay(attempt, result.headers.get('Retry-After'))
+                if not self._fits(deadline, delay):
+                    return result
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def stream_lines(self, provider: str, url: str, timeout: Optional[float] = None,
+                           **kwargs) -> AsyncIterator[str]:
+        """POST and yield the response body line by line, e.g. server-sent events.
+
+        Failures before the first line are retried like post(), within the
+        same overall `timeout`; once data has been yielded the stream is never
+        replayed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        session = self.session(provider)
+        attempt = 0
+        while True:
+            started = False
+            await self._throttle(provider)
+            attempt_timeout = self._attempt_timeout(deadline)
+            if attempt_timeout is not None:
+                kwargs['timeout'] = attempt_timeout
+            try:
+                async with session.post(url, **kwargs) as response:
+                    if response.status == 200:
+                        started = True
+                        async for raw_line in response.content:
+                            yield raw_line.decode('utf-8', 'replace').rstrip('\r\n')
+                        return
+                    error = ProviderHTTPError(response.status, await response.text())
+                    retry_after = response.headers.get('Retry-After')
+            except asyncio.TimeoutError:
+                raise
+            except aiohttp.ClientConnectionError:
+                delay = self.retry_policy.delay(attempt)
+                if started or not self.retry_policy.should_retry(None, attempt) or not self._fits(deadline, delay):
+                    raise
+            else:
+                if not self.retry_policy.should_retry(error.status_code, attempt):
+                    raise error
+                delay = self.retry_policy.delay(attempt, retry_after)
+                if not self._fits(deadline, delay):
+                    raise error
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def close(self) -> None:
+        """Close every pooled connection"""
+        sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            await session.close()
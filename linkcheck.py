@@ -0,0 +1,208 @@
+import time
+import socket
+import asyncio
+import logging
+import ipaddress
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+
+from http_pool import ProviderSessions
+from metrics import LINK_CHECKS
+
+logger = logging.getLogger(__name__)
+
+# Statuses meaning the page exists but refuses our probe (bot walls, auth, rate limits)
+_ALIVE_STATUSES = frozenset({401, 403, 429})
+# Statuses meaning the page is gone
+_DEAD_STATUSES = frozenset({404, 410})
+# HEAD not supported (or mishandled); retry with GET
+_HEAD_UNSUPPORTED = frozenset({400, 403, 405, 501})
+_REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+MAX_REDIRECTS = 5
+
+
+class LinkVerifier:
+    """Check that tool links resolve to a live page, concurrently and with cached outcomes.
+
+    Each URL gets a HEAD request (GET when HEAD is refused) with a short
+    timeout. A 2xx/3xx answer, or 401/403/429, counts as alive. A 404/410,
+    or a host that cannot be resolved or connected to, counts as dead. Other
+    outcomes (timeouts, 5xx) are unknown and never hide a link. Outcomes are
+    cached per URL, and unreachable hosts are cached per host and port, so repeat
+    checks are dictionary lookups. Hosts that resolve to private or loopback
+    addresses are not probed unless `allow_private` is set; redirects are
+    followed by hand so every hop's host is checked before it is contacted.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, http: ProviderSessions, concurrency: int = 20, per_host: int = 4, timeout: float = 3.0,
+                 ttl: float = 86400, failure_ttl: float = 600, max_size: int = 10000, allow_private: bool = False):
+        self.http = http
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.max_size = max_size
+        self.allow_private = allow_private
+        self.per_host = per_host
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._concurrency = concurrency
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._urls: OrderedDict = OrderedDict()  # url -> (expires_at, alive)
+        self._dead_hosts: Dict[str, float] = {}  # host -> expires_at
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def cached(self, url: str) -> Optional[bool]:
+        """The cached outcome for a URL (True alive, False dead), or None if unknown"""
+        now = time.monotonic()
+        if self._dead_hosts.get(urlsplit(url).netloc.lower(), 0) > now:
+            return False
+        entry = self._urls.get(url)
+        if entry is None:
+            return None
+        expires_at, alive = entry
+        if expires_at <= now:
+            del self._urls[url]
+            return None
+        self._urls.move_to_end(url)
+        return alive
+
+    async def check(self, url: str) -> Optional[bool]:
+        """Whether the URL is alive, using the cache; concurrent checks of one URL share a request"""
+        alive = self.cached(url)
+        if alive is not None or url in self._urls:
+            LINK_CHECKS.inc('cached')
+            return alive
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._probe(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda done: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def verify(self, urls: Iterable[str]) -> Dict[str, Optional[bool]]:
+        """Check every URL concurrently"""
+        unique = list(dict.fromkeys(urls))
+        outcomes = await asyncio.gather(*(self.check(url) for url in unique))
+        return dict(zip(unique, outcomes))
+
+    async def filter_tools(self, tools: List[Dict]) -> List[Dict]:
+        """Drop tools whose link is dead, checking all links at once"""
+        outcomes = await self.verify(tool['link'] for tool in tools)
+        return [tool for tool in tools if outcomes[tool['link']] is not False]
+
+    def drop_known_dead(self, tools: List[Dict]) -> List[Dict]:
+        """Drop tools whose link is already cached as dead, without any network I/O"""
+        return [tool for tool in tools if self.cached(tool['link']) is not False]
+
+    def verify_in_background(self, urls: Iterable[str]) -> None:
+        """Start checking URLs without waiting; later calls see the outcomes in the cache"""
+        pending = [url for url in dict.fromkeys(urls)
+                   if self.cached(url) is None and url not in self._urls and url not in self._inflight]
+        if pending:
+            task = asyncio.ensure_future(self.verify(pending))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _probe(self, url: str) -> Optional[bool]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        host_semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with self._semaphore, host_semaphore:
+            alive = self.cached(url)
+            if alive is not None:
+                return alive
+            if not self.allow_private and not await self._is_public(parts.hostname or ''):
+                LINK_CHECKS.inc('skipped')
+                self._remember(url, None)
+                return None
+            alive = await self._request(url, host)
+        LINK_CHECKS.inc({True: 'alive', False: 'dead', None: 'unknown'}[alive])
+        self._remember(url, alive)
+        return alive
+
+    async def _request(self, url: str, host: str) -> Optional[bool]:
+        """Probe one URL; `host` is its host:port, marked dead on connection failure"""
+        session = self.http.session('links')
+        deadline = time.monotonic() + self.timeout.total
+        try:
+            status = await self._status(session, 'HEAD', url, deadline)
+            if status in _HEAD_UNSUPPORTED:
+                status = await self._status(session, 'GET', url, deadline)
+        except aiohttp.ClientConnectorError as e:
+            # DNS failure or refused connection: every link on this host is dead for a while
+            logger.info("Link host unreachable: %s", e, extra={'host': host})
+            if e.host == urlsplit(url).hostname:
+                self._dead_hosts[host] = time.monotonic() + self.failure_ttl
+            return False
+        except aiohttp.InvalidURL:
+            return False
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.info("Link check inconclusive: %s %s", url, e)
+            return None
+        if status is None:
+            return None
+        if status < 400 or status in _ALIVE_STATUSES:
+            return True
+        if status in _DEAD_STATUSES:
+            return False
+        return None
+
+    async def _status(self, session: aiohttp.ClientSession, method: str, url: str, deadline: float) -> Optional[int]:
+        """Final status after redirects, or None when a hop leaves the public web or redirects loop"""
+        for _ in range(MAX_REDIRECTS + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            async with session.request(method, url, timeout=aiohttp.ClientTimeout(total=remaining),
+                                       allow_redirects=False) as response:
+                location = response.headers.get('Location')
+                if response.status not in _REDIRECT_STATUSES or not location:
+                    return response.status
+            url = urljoin(url, location)
+            parts = urlsplit(url)
+            if parts.scheme not in ('http', 'https') or (
+                    not self.allow_private and not await self._is_public(parts.hostname or '')):
+                logger.info("Link redirect not followed: %s", url)
+                return None
+        return None
+
+    async def _is_public(self, host: str) -> bool:
+        """Whether every address the host resolves to is globally routable"""
+        try:
+            return ipaddress.ip_address(host).is_global
+        except ValueError:
+            pass
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except (OSError, UnicodeError):
+            return True  # let the probe report the DNS failure
+        return all(ipaddress.ip_address(info[4][0].split('%')[0]).is_global for info in infos)
+
+    def _remember(self, url: str, alive: Optional[bool]) -> None:
+        # Unknown outcomes are cached briefly so a flaky host is not probed on every request
+        ttl = self.failure_ttl if alive is None else self.ttl
+        self._urls[url] = (time.monotonic() + ttl, alive)
+        self._urls.move_to_end(url)
+        while len(self._urls) > self.max_size:
+            self._urls.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """Cached outcomes, unreachable hosts and checks in progress"""
+        now = time.monotonic()
+        # list() snapshots in one step, so this is safe to call from other threads
+        outcomes = [alive for expires_at, alive in list(self._urls.values()) if expires_at > now]
+        return {
+            'alive': outcomes.count(True),
+            'dead': outcomes.count(False),
+            'unknown': outcomes.count(None),
+            'dead_hosts': sum(expires_at > now for expires_at in list(self._dead_hosts.values())),
+            'in_flight': len(self._inflight),
+            'background': len(self._background),
+            **{outcome: LINK_CHECKS.value(outcome) for outcome in ('cached', 'skipped')}
+        }
@@ -0,0 +1,207 @@
+import re
+import json
+import bisect
+from typing import Dict, List, Optional
+
+_TOKENS = re.compile(r'[\[\]{}",]')
+_STRING_END = re.compile(r'["\\]')
+_FIRST_CHAR = re.compile(r'\s*(\S)')
+_ARRAY_START = re.compile(r'\[\s*\{')
+_DECODER = json.JSONDecoder()
+
+
+def _is_tool_list(value) -> bool:
+    return isinstance(value, list) and (not value or any(isinstance(item, dict) for item in value))
+
+
+def _decode_array(text: str, start: int, end: int, trailing_commas: List[int]) -> Optional[List]:
+    """Decode text[start:end] with trailing commas removed; None unless it is a list of objects (or empty)"""
+    pieces = []
+    cursor = start
+    # Commas are recorded in text order, so skip straight to those inside this candidate
+    for comma in trailing_commas[bisect.bisect_right(trailing_commas, start):]:
+        pieces.append(text[cursor:comma])
+        cursor = comma + 1
+    pieces.append(text[cursor:end])
+    try:
+        value = json.loads(''.join(pieces))
+    except (ValueError, RecursionError):
+        return None
+    return value if _is_tool_list(value) else None
+
+
+def extract_json_array(text: str) -> Optional[List]:
+    """Return the first balanced non-empty JSON array of objects in an LLM completion,
+    an empty list if the only arrays found are empty, or None.
+
+    One left-to-right pass over the structural characters: prose, code
+    fences and stray brackets around the array are skipped, brackets inside
+    strings are ignored and trailing commas are dropped before decoding.
+    An array nested in prose brackets ("see [the list: [{...}]]") is found
+    too; arrays nested inside objects are left to their parent. A candidate
+    enclosing one that failed to decode cannot decode either, so it is not
+    tried: each character is decoded at most once per failed candidate
+    chain, keeping the cost linear however deep invalid arrays nest.
+    """
+    # Fast path: well-formed output decodes in one C-level call from the first '[{'.
+    # An empty array is an answer only if no array of objects follows it, so it is left to the scan
+    start = _ARRAY_START.search(text)
+    if start is not None:
+        try:
+            value = _DECODER.raw_decode(text, start.start())[0]
+        except (ValueError, RecursionError):
+            pass
+        else:
+            if _is_tool_list(value):
+                return value
+
+    stack: List[str] = []  # open brackets of the current candidate
+    openers: List[int] = []
+    trailing_commas: List[int] = []
+    braces = 0
+    last_comma = -1
+    # stack[:invalid_below] all enclose a candidate that failed to decode
+    invalid_below = 0
+    found_empty = False
+    pos = 0
+    while True:
+        match = _TOKENS.search(text, pos)
+        if match is None:
+            return [] if found_empty else None
+        char = match.group()
+        index = match.start()
+        pos = index + 1
+
+        if not stack:
+            # Outside any array quotes, braces and commas are just prose
+            if char == '[':
+                stack.append('[')
+                openers.append(index)
+                trailing_commas = []
+                last_comma = -1
+            continue
+
+        if char == '"':
+            while True:
+                end = _STRING_END.search(text, pos)
+                if end is None:
+                    return [] if found_empty else None  # unterminated string: truncated completion
+                if end.group() == '"':
+                    pos = end.end()
+                    break
+                pos = end.end() + 1  # skip the escaped character
+            continue
+        if char == ',':
+            last_comma = index
+            continue
+        if char in '[{':
+            stack.append(char)
+            openers.append(index)
+            braces += char == '{'
+            last_comma = -1
+            continue
+
+        # Closing bracket
+        if last_comma != -1 and not text[last_comma + 1:index].strip():
+            trailing_commas.append(last_comma)
+        last_comma = -1
+        if stack[-1] != ('[' if char == ']' else '{'):
+            # Mismatched brackets: this was not JSON, look for the next array
+            stack, openers, braces, invalid_below = [], [], 0, 0
+            continue
+        stack.pop()
+        start = openers.pop()
+        if char == '}':
+            braces -= 1
+            invalid_below = min(invalid_below, len(stack))
+            continue
+        if len(stack) < invalid_below:
+            invalid_below = len(stack)  # this array encloses a failed one; its parents still do
+            continue
+        if braces == 0 and (not stack or _FIRST_CHAR.match(text, start + 1).group(1) in '{]'):
+            value = _decode_array(text, start, index + 1, trailing_commas)
+            if value:
+                return value
+            if value is not None:
+                found_empty = True
+                continue
+            # Valid JSON has no invalid bracketed part, so every enclosing array is invalid too
+            invalid_below = len(stack)
+
+
+class IncrementalArrayParser:
+    """Pull complete objects out of a JSON array while it is still being generated.
+
+    Text is fed in arbitrary chunks (e.g. streamed completion deltas). Anything
+    before the first '[' followed by '{' - code fences, prose, bracketed
+    asides like "[5]" - is skipped, and every top-level object of the array
+    is decoded as soon as its closing brace arrives.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        self._opened = False  # saw '[' and waiting for its first non-blank character
+        self._finished = False
+        self._object: List[str] = []
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing ']' of the array has been seen"""
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume a chunk of text and return the objects it completed"""
+        completed = []
+        for char in chunk:
+            if self._finished:
+                break
+            if not self._started:
+                if self._opened and not char.isspace():
+                    # Only an array of objects is the answer; '[5]' or '[]' in prose is not
+                    self._opened = char == '['
+                    if char != '{':
+                        continue
+                    self._started = True
+                    self._depth = 1
+                else:
+                    self._opened = self._opened or char == '['
+                    continue
+
+            if self._depth >= 2:
+                self._object.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+                if self._depth == 2:
+                    self._object = [char]
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 1:
+                    item = self._decode(''.join(self._object))
+                    if isinstance(item, dict):
+                        completed.append(item)
+                    self._object = []
+                elif self._depth == 0:
+                    self._finished = True
+        return completed
+
+    @staticmethod
+    def _decode(text: str):
+        try:
+            return json.loads(text)
+        except (ValueError, RecursionError):
+            return None
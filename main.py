@@ -1,14 +1,56 @@
 import os
 import json
-import requests
-import re
+import logging
+import argparse
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
 import time
+import asyncio
+from async_runtime import AsyncRuntime
+from cache import RecommendationCache, normalize_query
+from http_pool import ProviderResponse, ProviderSessions, RetryPolicy
+from health import ProviderHealth, SharedCircuitStore
+from hedging import HedgeBudget
+from singleflight import SingleFlight
+from admission import AdmissionController, AdmissionRejected
+from linkcheck import LinkVerifier
+from warmup import CacheWarmer, QueryLog, WarmupLease
+
+try:
+    from semantic_cache import SemanticCache
+except ImportError:  # numpy not installed
+    SemanticCache = None
+from ratelimit import parse_rate_limits
+from catalog import ToolCatalog
+from llm_json import IncrementalArrayParser, extract_json_array
+from prompts import ToolPrompt, expand_tool, expand_tools
+from batch import BATCH_MODES, run_batch
+from metrics import CACHE_LOOKUPS, FALLBACKS, PROVIDER_CALLS, STAGE_SECONDS, configure_logging, ensure_trace_id, record_usage, timed
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+LOCAL_SOURCE = 'Local database'
+# Source of answers shed to the local catalog because upstream providers were saturated
+SHED_SOURCE = 'Local database (providers busy)'
+
+# Circuit-breaker key for each entry returned by get_llm_providers
+PROVIDER_KEYS = {'OpenAI GPT': 'openai', 'Claude': 'anthropic', 'DeepSeek': 'deepseek'}
+
+# Extra search terms per category so everyday wording finds the right tools
+CATEGORY_KEYWORDS = {
+    'pdf_converter': ['convert', 'file', 'document'],
+    'csv_tools': ['convert', 'file', 'spreadsheet', 'data'],
+    'image_generator': ['image', 'picture', 'photo', 'art', 'generate'],
+    'text_generator': ['text', 'write', 'writing', 'content', 'chat'],
+    'code_assistant': ['code', 'coding', 'programming', 'developer'],
+    'video_editor': ['video', 'edit', 'movie'],
+    'design_tools': ['design', 'ui', 'graphic', 'logo'],
+    'music_generator': ['music', 'audio', 'sound', 'song']
+}
+
 class AIToolRecommendationSystem:
     def __init__(self):
         self.github_token = os.getenv('GITHUB_TOKEN')
@@ -16,261 +58,682 @@ class AIToolRecommendationSystem:
         self.anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
         self.deepseek_api_key = os.getenv('DEEPSEEK_API_KEY')
         
-        # GitHub Models API endpoint
-        self.github_api_base = "https://models.inference.ai.azure.com"
-        
-        # AI tools database with categories and descriptions
-        self.ai_tools_database = {
-            "pdf_converter": [
-                {"name": "SmallPDF", "link": "https://smallpdf.com", "description": "Online PDF converter and editor"},
-                {"name": "ILovePDF", "link": "https://www.ilovepdf.com", "description": "Free online PDF tools"},
-                {"name": "PDF24", "link": "https://tools.pdf24.org", "description": "Free PDF tools and converter"},
-                {"name": "Sejda PDF", "link": "https://www.sejda.com", "description": "Online PDF editor and converter"}
-            ],
-            "csv_tools": [
-                {"name": "CSV to PDF Converter", "link": "https://www.convertcsv.com/csv-to-pdf.htm", "description": "Convert CSV files to PDF format"},
-                {"name": "Online CSV Tools", "link": "https://onlinecsvtools.com", "description": "Collection of CSV manipulation tools"},
-                {"name": "CSV Kit", "link": "https://csvkit.readthedocs.io", "description": "Command-line tools for CSV files"}
-            ],
-            "image_generator": [
-                {"name": "DALL-E 2", "link": "https://openai.com/dall-e-2", "description": "AI image generator by OpenAI"},
-                {"name": "Midjourney", "link": "https://midjourney.com", "description": "AI art generator"},
-                {"name": "Stable Diffusion", "link": "https://stability.ai", "description": "Open-source AI image generator"},
-                {"name": "Leonardo AI", "link": "https://leonardo.ai", "description": "AI-powered creative platform"}
-            ],
-            "text_generator": [
-                {"name": "ChatGPT", "link": "https://chat.openai.com", "description": "Conversational AI by OpenAI"},
-                {"name": "Claude", "link": "https://claude.ai", "description": "AI assistant by Anthropic"},
-                {"name": "Gemini", "link": "https://gemini.google.com", "description": "Google's AI chatbot"},
-                {"name": "Copy.ai", "link": "https://copy.ai", "description": "AI copywriting tool"}
-            ],
-            "code_assistant": [
-                {"name": "GitHub Copilot", "link": "https://github.com/features/copilot", "description": "AI pair programmer"},
-                {"name": "Tabnine", "link": "https://www.tabnine.com", "description": "AI code completion"},
-                {"name": "CodeWhisperer", "link": "https://aws.amazon.com/codewhisperer", "description": "Amazon's AI coding companion"},
-                {"name": "Cursor", "link": "https://cursor.sh", "description": "AI-first code editor"}
-            ],
-            "video_editor": [
-                {"name": "Runway ML", "link": "https://runwayml.com", "description": "AI video editing and generation"},
-                {"name": "Synthesia", "link": "https://www.synthesia.io", "description": "AI video generator with avatars"},
-                {"name": "Lumen5", "link": "https://lumen5.com", "description": "AI-powered video creation"},
-                {"name": "InVideo", "link": "https://invideo.io", "description": "AI video maker"}
-            ],
-            "design_tools": [
-                {"name": "Canva", "link": "https://www.canva.com", "description": "AI-enhanced design platform"},
-                {"name": "Adobe Firefly", "link": "https://www.adobe.com/products/firefly.html", "description": "Adobe's generative AI"},
-                {"name": "Figma", "link": "https://www.figma.com", "description": "Collaborative design tool with AI features"},
-                {"name": "Uizard", "link": "https://uizard.io", "description": "AI-powered design tool"}
-            ],
-            "music_generator": [
-                {"name": "AIVA", "link": "https://www.aiva.ai", "description": "AI music composer"},
-                {"name": "Mubert", "link": "https://mubert.com", "description": "AI music generator"},
-                {"name": "Soundful", "link": "https://soundful.com", "description": "AI music creation platform"},
-                {"name": "Boomy", "link": "https://boomy.com", "description": "Create songs with AI"}
-            ]
-        }
+        # Provider API endpoints (overridable, e.g. to point at the bench/ stub server)
+        self.github_api_base = os.getenv('GITHUB_API_BASE', "https://models.inference.ai.azure.com")
+        self.openai_api_base = os.getenv('OPENAI_API_BASE', "https://api.openai.com/v1")
+        self.anthropic_api_base = os.getenv('ANTHROPIC_API_BASE', "https://api.anthropic.com/v1")
+        self.deepseek_api_base = os.getenv('DEEPSEEK_API_BASE', "https://api.deepseek.com/v1")
+        
+        # Concurrent provider fan-out: query every configured LLM at once and
+        # keep the first response that parses into valid tools
+        self.llm_fanout = os.getenv('LLM_FANOUT', 'true').lower() not in ('0', 'false', 'no')
+        self.llm_deadline = float(os.getenv('LLM_DEADLINE_SECONDS', '20'))
+        
+        # Background event loop that multiplexes every upstream call; the sync
+        # methods below are thin wrappers that block on it
+        self.runtime = AsyncRuntime()
+        
+        # Pooled keep-alive sessions per provider with retry/backoff for 429/5xx
+        self.http = ProviderSessions(
+            pool_size=int(os.getenv('HTTP_POOL_SIZE', '20')),
+            connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05')),
+            read_timeout=float(os.getenv('HTTP_READ_TIMEOUT', '30')),
+            retry_policy=RetryPolicy(max_retries=int(os.getenv('HTTP_MAX_RETRIES', '2')))
+        )
+        
+        # Per-provider rate limits with a bounded wait queue; calls that cannot be
+        # admitted in time are shed to the local catalog instead of piling up
+        self.admission = AdmissionController(
+            parse_rate_limits(os.getenv('PROVIDER_RATE_LIMITS', '')),
+            max_queue=int(os.getenv('ADMISSION_MAX_QUEUE', '16')),
+            max_wait=float(os.getenv('ADMISSION_MAX_WAIT_SECONDS', '2'))
+        )
+        
+        # Rolling latency/error windows and circuit breakers per provider and model;
+        # circuit state is shared with the other worker processes on this node
+        health_state_path = os.getenv('HEALTH_STATE_PATH', '.cache/provider_health.sqlite3')
+        self.health = ProviderHealth(
+            cooldown=float(os.getenv('CIRCUIT_COOLDOWN_SECONDS', '30')),
+            consecutive_failures=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '3')),
+            default_timeout=float(os.getenv('HTTP_READ_TIMEOUT', '30')),
+            min_timeout=float(os.getenv('ADAPTIVE_TIMEOUT_MIN', '2')),
+            max_timeout=float(os.getenv('HTTP_READ_TIMEOUT', '30')),
+            store=SharedCircuitStore(health_state_path) if health_state_path else None
+        )
+        
+        # Hedged requests: fire the next model when one is slower than its usual p90
+        self.hedging = os.getenv('HEDGING', 'true').lower() not in ('0', 'false', 'no')
+        self.hedge_percentile = 0.9
+        self.hedge_default_delay = float(os.getenv('HEDGE_DELAY_SECONDS', '5'))
+        self.hedge_budget = HedgeBudget(ratio=float(os.getenv('HEDGE_BUDGET_RATIO', '0.1')))
+        
+        # GitHub Models tried in order by find_with_ai
+        self.github_models = ["gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo"]
+        
+        # Prompts ask for exactly as many tools, and as long descriptions, as each
+        # endpoint keeps; completion caps are derived from those limits
+        tool_count = int(os.getenv('LLM_TOOL_COUNT', '5'))
+        self.recommend_prompt = ToolPrompt(count=tool_count, description_chars=100)
+        self.find_prompt = ToolPrompt(count=tool_count, description_chars=160)
+        
+        # Result cache in front of recommend_tools and find_with_ai
+        self.cache = RecommendationCache(
+            max_size=int(os.getenv('CACHE_MAX_ENTRIES', '1024')),
+            ttl=float(os.getenv('CACHE_TTL_SECONDS', '3600')),
+            path=os.getenv('CACHE_PATH', '.cache/recommendations.sqlite3') or None,
+            disk_max_size=int(os.getenv('CACHE_DISK_MAX_ENTRIES', '100000'))
+        )
+        
+        # Near-duplicate query cache (needs numpy; disabled without it)
+        self.semantic_cache = None
+        if SemanticCache is not None and os.getenv('SEMANTIC_CACHE', 'true').lower() not in ('0', 'false', 'no'):
+            self.semantic_cache = SemanticCache(
+                max_size=int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '100000')),
+                threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.75')),
+                ttl=float(os.getenv('CACHE_TTL_SECONDS', '3600'))
+            )
+        
+        # Liveness checks for links suggested by LLMs: 'sync' verifies them before
+        # answering, 'background' answers at once and hides links later found dead
+        self.link_verify_mode = os.getenv('LINK_VERIFY', 'background').lower()
+        self.link_verifier = LinkVerifier(
+            self.http,
+            concurrency=int(os.getenv('LINK_VERIFY_CONCURRENCY', '20')),
+            timeout=float(os.getenv('LINK_VERIFY_TIMEOUT', '3')),
+            ttl=float(os.getenv('LINK_VERIFY_TTL_SECONDS', '86400')),
+            allow_private=os.getenv('LINK_VERIFY_ALLOW_PRIVATE', 'false').lower() in ('1', 'true', 'yes')
+        )
+        
+        # Log of served queries; cache warm-up re-computes the most popular ones
+        # before their cached results expire, within a per-run upstream call budget.
+        # Workers sharing the cache file elect one warmer through a lease row in it
+        query_log_path = os.getenv('QUERY_LOG_PATH', '.cache/query_log.jsonl')
+        self.query_log = QueryLog(query_log_path) if query_log_path else None
+        self.cache_warmer = None
+        self._warm_task = None
+        if self.query_log is not None:
+            warm_interval = float(os.getenv('CACHE_WARM_INTERVAL_SECONDS', '300'))
+            self.cache_warmer = CacheWarmer(
+                self, query_log_path,
+                top_n=int(os.getenv('CACHE_WARM_TOP_N', '50')),
+                concurrency=int(os.getenv('CACHE_WARM_CONCURRENCY', '2')),
+                max_calls=int(os.getenv('CACHE_WARM_MAX_CALLS', '100')),
+                interval=warm_interval,
+                lease=WarmupLease(self.cache.path, ttl=2 * warm_interval + 60) if self.cache.path else None
+            )
+        
+        # In-flight deduplication of identical concurrent queries
+        self.single_flight = SingleFlight()
+        
+        # AI tools catalog, loaded from a JSONL file on first use and hot-reloaded on change
+        self.catalog = ToolCatalog(
+            os.getenv('TOOL_CATALOG_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ai_tools.jsonl')),
+            reload_interval=float(os.getenv('TOOL_CATALOG_RELOAD_SECONDS', '5')),
+            category_keywords=CATEGORY_KEYWORDS
+        )
+        # Parse the catalog and build its search index now, off any request path
+        self.catalog.preload()
 
-    def query_github_models(self, query: str, model: str = "gpt-4o-mini") -> Optional[str]:
-        """Query GitHub Models API with optimal prompt for AI tool recommendations"""
-        if not self.github_token:
-            return None
-            
+    @property
+    def ai_tools_database(self) -> Dict[str, List[Dict]]:
+        """The local catalog as {category: [tool, ...]}"""
+        return self.catalog.snapshot().as_dict()
+
+    def build_github_request(self, query: str, model: str, stream: bool = False) -> Tuple[Dict, Dict]:
+        """Build headers and payload for a GitHub Models chat completion"""
         headers = {
             "Authorization": f"Bearer {self.github_token}",
             "Content-Type": "application/json"
         }
         
-        # Robust and optimal prompt for consistent results
-        prompt = f"""You are an AI tool discovery expert. Find exactly 5 AI tools/services for this query: "{query}"
-
-IMPORTANT REQUIREMENTS:
-1. Return ONLY a valid JSON array - no other text
-2. Each tool must have real, working links (no placeholders)
-3. Verify tools exist and are currently available
-4. Focus on popular, established AI tools
-5. Include diverse options from different categories
-
-FORMAT (strict JSON only):
-[
-    {{"name": "Tool Name", "link": "https://actual-working-url.com", "description": "Brief 1-2 sentence description of what it does"}},
-    {{"name": "Tool Name 2", "link": "https://another-real-url.com", "description": "Brief 1-2 sentence description"}}
-]
-
-Query: {query}
-
-Remember: Return only the JSON array, no explanations or additional text."""
-        
         data = {
             "model": model,
-            "messages": [
-                {
-                    "role": "system", 
-                    "content": "You are a precise AI tool discovery assistant. Always respond with valid JSON arrays only. Never include explanations or markdown formatting."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 1500,
+            "messages": self.find_prompt.messages(query),
+            "max_tokens": self.find_prompt.max_tokens,
             "temperature": 0.3
         }
+        if stream:
+            data["stream"] = True
+        
+        return headers, data
+
+    async def query_github_models_async(self, query: str, model: str = "gpt-4o-mini") -> Optional[str]:
+        """Query GitHub Models API with optimal prompt for AI tool recommendations"""
+        if not self.github_token:
+            return None
+        
+        headers, data = self.build_github_request(query, model)
         
         try:
-            response = requests.post(
+            response = await self.post_with_health(
+                'github', model,
                 f"{self.github_api_base}/chat/completions", 
                 headers=headers, 
-                json=data, 
-                timeout=30
+                json=data
             )
             
             if response.status_code == 200:
                 result = response.json()
+                record_usage('github', model, result)
                 return result["choices"][0]["message"]["content"].strip()
             else:
-                print(f"GitHub Models API error: {response.status_code} - {response.text}")
+                logger.warning("GitHub Models API error %s: %s", response.status_code, response.text[:200],
+                               extra={'provider': 'github', 'model': model})
                 return None
                 
         except Exception as e:
-            print(f"GitHub Models API error: {e}")
+            logger.warning("GitHub Models API error: %s", e, extra={'provider': 'github', 'model': model})
             return None
 
-    def find_with_ai(self, query: str) -> Dict:
+    async def find_with_ai_async(self, query: str) -> Dict:
         """Find AI tools using GitHub Models API"""
         if not query.strip():
             return {'error': 'Please provide a query', 'tools': [], 'total_found': 0}
+        ensure_trace_id()
         
-        print(f"🤖 AI Search initiated for: '{query}'")
+        # Concurrent identical queries share one upstream round-trip
+        result = await self.single_flight.do(
+            ('find_with_ai', normalize_query(query)),
+            lambda: self._find_with_ai_async(query)
+        )
+        result = await self.verify_links(result)
+        return dict(result, query=query)
+
+    async def _find_with_ai_async(self, query: str, refresh: bool = False) -> Dict:
+        logger.info("AI search initiated", extra={'query': query})
         
         if not self.github_token:
-            print("❌ No GitHub token found - falling back to database search")
-            return self.recommend_tools(query)
+            logger.warning("No GitHub token found - falling back to database search")
+            FALLBACKS.inc('find_with_ai', 'no_token')
+            return await self.recommend_tools_async(query)
         
         # Try different models for best results
-        models_to_try = ["gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo"]
+        models_to_try = self.github_models
         
-        for model in models_to_try:
-            try:
-                print(f"🤖 Querying {model} for: {query}")
-                response = self.query_github_models(query, model)
+        cache_scope = self.cache_scope('find_with_ai')
+        cached = None if refresh else self.get_cached_result('find_with_ai', cache_scope, query)
+        if cached is not None:
+            return cached
+        
+        if not self.admission.has_capacity('github', self.admission_budget('github')):
+            return await self.shed_result('find_with_ai', query)
+        
+        result = await self.hedged_github_search(query, models_to_try)
+        if result:
+            self.cache_result('find_with_ai', cache_scope, query, result)
+            return result
+        
+        # Fallback to database search if AI fails
+        logger.warning("AI search failed, falling back to database search")
+        FALLBACKS.inc('find_with_ai', 'models_failed')
+        return await self.recommend_tools_async(query)
+
+    async def try_github_model(self, query: str, model: str) -> Optional[Dict]:
+        """Query one GitHub model and return a validated result, or None"""
+        try:
+            logger.info("Querying GitHub model", extra={'model': model})
+            response = await self.query_github_models_async(query, model)
+            
+            if response:
+                logger.debug("Raw AI response: %s", response[:200], extra={'model': model})
                 
-                if response:
-                    # Clean the response - remove any markdown formatting
-                    cleaned_response = response.strip()
-                    if cleaned_response.startswith('```json'):
-                        cleaned_response = cleaned_response[7:]
-                    if cleaned_response.endswith('```'):
-                        cleaned_response = cleaned_response[:-3]
-                    cleaned_response = cleaned_response.strip()
-                    
-                    print(f"✅ Raw AI response from {model}: {cleaned_response[:200]}...")
-                    
-                    # Parse JSON response
-                    tools = json.loads(cleaned_response)
-                    
-                    if isinstance(tools, list) and len(tools) > 0:
-                        # Validate and clean tools
+                # Find the JSON array, skipping code fences and surrounding prose
+                with timed('parse', 'github', model):
+                    tools = extract_json_array(response)
+                
+                if tools is None:
+                    logger.warning("No JSON array in response", extra={'model': model})
+                elif len(tools) > 0:
+                    # Validate and clean tools
+                    with timed('validate', 'github', model):
                         validated_tools = []
-                        for tool in tools[:5]:  # Limit to 5 tools
-                            if (isinstance(tool, dict) and 
-                                'name' in tool and 
-                                'link' in tool and 
-                                'description' in tool and
-                                tool['link'].startswith(('http://', 'https://'))):
-                                validated_tools.append({
-                                    'name': tool['name'][:100],  # Limit length
-                                    'link': tool['link'],
-                                    'description': tool['description'][:200]  # Limit length
-                                })
-                        
-                        if validated_tools:
-                            print(f"✅ Successfully found {len(validated_tools)} AI tools using {model}")
-                            return {
-                                'query': query,
-                                'tools': validated_tools,
-                                'total_found': len(validated_tools),
-                                'source': f'AI-powered by {model}'
-                            }
+                        for tool in expand_tools(tools[:self.find_prompt.count]):
+                            validated = self.validate_tool(tool)
+                            if validated:
+                                validated_tools.append(validated)
+                    
+                    if validated_tools:
+                        logger.info("Found %d AI tools", len(validated_tools), extra={'model': model})
+                        return {
+                            'query': query,
+                            'tools': validated_tools,
+                            'total_found': len(validated_tools),
+                            'source': f'AI-powered by {model}'
+                        }
+        
+        except Exception as e:
+            logger.warning("Error querying model: %s", e, extra={'model': model})
+        return None
+
+    def hedge_delay(self, model: str) -> float:
+        """How long to wait on a model before hedging with the next one"""
+        observed = self.health.latency_percentile('github', self.hedge_percentile, model)
+        return observed if observed is not None else self.hedge_default_delay
+
+    async def hedged_github_search(self, query: str, models: List[str]) -> Optional[Dict]:
+        """Try models in order; if the newest attempt is slower than its usual p90,
+        start the next model in parallel and keep whichever valid result arrives first"""
+        self.hedge_budget.record_request()
+        remaining = list(models)
+        running = {}  # task -> (model, is_hedge)
+        
+        def launch(is_hedge: bool) -> Optional[str]:
+            while remaining:
+                model = remaining.pop(0)
+                if self.health.allow('github', model):
+                    running[asyncio.ensure_future(self.try_github_model(query, model))] = (model, is_hedge)
+                    return model
+                logger.info("Skipping model: circuit open", extra={'model': model})
+            return None
+        
+        def hedge() -> bool:
+            nonlocal newest
+            model = launch(True)
+            if model is not None:
+                newest = model
+            return model is not None
+        
+        newest = launch(False)
+        try:
+            while running:
+                can_hedge = self.hedging and bool(remaining)
+                timeout = self.hedge_delay(newest) if can_hedge else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    # Primary is slow: hedge with the next model whose circuit allows it, if the
+                    # budget allows; no token is spent when every remaining circuit is open
+                    slow = newest
+                    if self.hedge_budget.try_hedge(hedge):
+                        logger.info("Hedging slow model with the next one", extra={'model': slow})
+                    else:
+                        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
                 
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON parsing error with {model}: {e}")
+                for task in done:
+                    model, is_hedge = running.pop(task)
+                    result = task.result()
+                    if result:
+                        if is_hedge:
+                            self.hedge_budget.record_win()
+                        return result
+                
+                # Every in-flight attempt failed: fall through to the next model
+                if done and not running:
+                    newest = launch(False)
+        finally:
+            for task in running:
+                task.cancel()
+        
+        return None
+
+    async def verify_links(self, result: Dict) -> Dict:
+        """Drop tools with dead links from an LLM-sourced result, according to LINK_VERIFY"""
+        tools = result.get('tools')
+        if (self.link_verify_mode in ('0', 'false', 'no', 'off') or not tools
+                or result.get('source') in (LOCAL_SOURCE, SHED_SOURCE)):
+            return result
+        with timed('link_verify'):
+            if self.link_verify_mode == 'sync':
+                live = await self.link_verifier.filter_tools(tools)
+            else:
+                self.link_verifier.verify_in_background(tool['link'] for tool in tools)
+                live = self.link_verifier.drop_known_dead(tools)
+        if len(live) == len(tools):
+            return result
+        logger.info("Dropped %d tool(s) with dead links", len(tools) - len(live))
+        return dict(result, tools=live, total_found=len(live))
+
+    def admission_budget(self, provider: str, model: Optional[str] = None) -> float:
+        """How long a call may wait for admission and still finish within the LLM deadline"""
+        expected = self.health.latency_percentile(provider, 0.5, model) or 0.0
+        return self.llm_deadline - expected
+
+    async def shed_result(self, endpoint: str, query: str) -> Dict:
+        """Answer from the local catalog right away because upstream providers are saturated"""
+        logger.warning("Upstream providers saturated, answering from the local catalog")
+        FALLBACKS.inc(endpoint, 'shed')
+        tools = json.loads(await self.fallback_response_async(query))
+        return {'query': query, 'tools': tools, 'total_found': len(tools), 'source': SHED_SOURCE}
+
+    def cache_scope(self, endpoint: str) -> str:
+        """The part of an endpoint's cache keys naming the models or providers that answer it"""
+        if endpoint == 'find_with_ai':
+            return 'github:' + ','.join(self.github_models)
+        return ','.join(name for name, _ in self.get_llm_providers()) or 'local'
+
+    def cache_expires_in(self, endpoint: str, query: str) -> Optional[float]:
+        """Seconds until the cached result for a query expires, or None if it is not cached"""
+        return self.cache.expires_in(self.cache.make_key(endpoint, query, self.cache_scope(endpoint)))
+
+    async def refresh_async(self, endpoint: str, query: str) -> Dict:
+        """Recompute a query's result upstream and store it in the cache, ignoring any cached copy"""
+        compute = self._find_with_ai_async if endpoint == 'find_with_ai' else self._recommend_tools_async
+        return await self.single_flight.do(
+            (endpoint, normalize_query(query)),
+            lambda: compute(query, refresh=True)
+        )
+
+    def log_query(self, endpoint: str, query: str) -> None:
+        """Append a served query to the query log that cache warm-up ranks"""
+        if self.query_log is not None and query.strip():
+            self.query_log.record(endpoint, query.strip())
+
+    @property
+    def cache_warming(self) -> bool:
+        """Whether scheduled cache warm-up is running"""
+        return self._warm_task is not None
+
+    def start_cache_warmer(self) -> None:
+        """Warm the cache from the query log now and then every CACHE_WARM_INTERVAL_SECONDS"""
+        if self.cache_warmer is not None and self._warm_task is None:
+            self._warm_task = self.runtime.submit(self.cache_warmer.run_forever())
+
+    def get_cached_result(self, endpoint: str, scope: str, query: str) -> Optional[Dict]:
+        """Look a query up in the exact cache, then in the near-duplicate cache"""
+        with timed('cache_lookup'):
+            cached = self.cache.get(self.cache.make_key(endpoint, query, scope))
+            CACHE_LOOKUPS.inc(endpoint, 'exact', 'miss' if cached is None else 'hit')
+            if cached is None and self.semantic_cache is not None:
+                cached = self.semantic_cache.get(f"{endpoint}|{scope}", query)
+                CACHE_LOOKUPS.inc(endpoint, 'semantic', 'miss' if cached is None else 'hit')
+                if cached is not None:
+                    logger.info("Similar-query cache hit", extra={'query': query})
+        if cached is not None:
+            cached['query'] = query
+        return cached
+
+    def cache_result(self, endpoint: str, scope: str, query: str, result: Dict) -> None:
+        """Store a result in the exact and near-duplicate caches"""
+        self.cache.set(self.cache.make_key(endpoint, query, scope), result)
+        if self.semantic_cache is not None:
+            self.semantic_cache.set(f"{endpoint}|{scope}", query, result)
+
+    @staticmethod
+    def validate_tool(tool) -> Optional[Dict]:
+        """Return a cleaned copy of an AI-suggested tool, or None if it is unusable"""
+        if (isinstance(tool, dict) and
+                isinstance(tool.get('name'), str) and
+                isinstance(tool.get('link'), str) and
+                isinstance(tool.get('description'), str) and
+                tool['link'].startswith(('http://', 'https://'))):
+            return {
+                'name': tool['name'][:100],  # Limit length
+                'link': tool['link'],
+                'description': tool['description'][:200]  # Limit length
+            }
+        return None
+
+    async def stream_github_models_async(self, query: str, model: str = "gpt-4o-mini") -> AsyncIterator[str]:
+        """Stream completion text deltas from GitHub Models as they are generated"""
+        headers, data = self.build_github_request(query, model, stream=True)
+        await self.admission.admit('github', self.admission_budget('github', model))
+        async for line in self.http.stream_lines('github', f"{self.github_api_base}/chat/completions",
+                                                 headers=headers, json=data):
+            if not line.startswith('data:'):
                 continue
-            except Exception as e:
-                print(f"❌ Error with {model}: {e}")
+            payload = line[5:].strip()
+            if payload == '[DONE]':
+                break
+            try:
+                choices = json.loads(payload).get('choices') or []
+            except ValueError:
                 continue
-        
-        # Fallback to database search if AI fails
-        print("🔄 AI search failed, falling back to database search")
-        return self.recommend_tools(query)
+            if choices:
+                delta = (choices[0].get('delta') or {}).get('content')
+                if delta:
+                    yield delta
 
-    def get_best_llm_response(self, query: str) -> str:
-        """Try different LLM APIs and return the best response"""
-        responses = []
+    async def find_with_ai_stream_async(self, query: str) -> AsyncIterator[Dict]:
+        """Find AI tools with GitHub Models, yielding each validated tool as soon as it is generated.
+
+        Yields {'event': 'tool', 'data': tool} per tool and a final
+        {'event': 'done', 'data': {...}} with the query, count and source.
+        """
+        ensure_trace_id()
+        models_to_try = self.github_models
+        cache_scope = self.cache_scope('find_with_ai')
+        cached = self.get_cached_result('find_with_ai', cache_scope, query)
+        if cached is not None:
+            cached = await self.verify_links(cached)
+        verify_links = self.link_verify_mode not in ('0', 'false', 'no', 'off')
+        if cached is None and self.github_token and not self.admission.has_capacity('github', self.admission_budget('github')):
+            cached = await self.shed_result('find_with_ai_stream', query)
         
-        # Try OpenAI GPT
-        if self.openai_api_key:
-            try:
-                gpt_response = self.query_openai(query)
-                if gpt_response:
-                    responses.append(("OpenAI GPT", gpt_response))
-            except Exception as e:
-                print(f"OpenAI error: {e}")
+        if cached is None and self.github_token:
+            for model in models_to_try:
+                if not self.health.allow('github', model):
+                    logger.info("Skipping model: circuit open", extra={'model': model})
+                    continue
+                parser = IncrementalArrayParser()
+                tools = []
+                complete = False
+                started = time.monotonic()
+                try:
+                    logger.info("Streaming GitHub model", extra={'model': model})
+                    async for delta in self.stream_github_models_async(query, model):
+                        for item in parser.feed(delta):
+                            tool = self.validate_tool(expand_tool(item))
+                            if tool and verify_links and self.link_verifier.cached(tool['link']) is False:
+                                continue
+                            if tool:
+                                tools.append(tool)
+                                yield {'event': 'tool', 'data': tool}
+                            if len(tools) >= self.find_prompt.count:
+                                break
+                        if len(tools) >= self.find_prompt.count or parser.finished:
+                            break
+                    # The array closed or we have every tool we asked for; otherwise the stream was cut short
+                    complete = parser.finished or len(tools) >= self.find_prompt.count
+                    # A stream that yields no usable tool failed as far as callers are concerned
+                    self.health.record('github', time.monotonic() - started, bool(tools), model)
+                    STAGE_SECONDS.observe(time.monotonic() - started, 'provider_stream', 'github', model)
+                    PROVIDER_CALLS.inc('github', model, 'ok' if tools else 'no_tools')
+                except AdmissionRejected as e:
+                    # Shed before any request was sent; not a provider failure
+                    logger.warning("%s", e, extra={'model': model})
+                except Exception as e:
+                    self.health.record('github', time.monotonic() - started, False, model)
+                    PROVIDER_CALLS.inc('github', model, 'error')
+                    logger.warning("Streaming error: %s", e, extra={'model': model})
+                
+                if tools:
+                    if verify_links:
+                        # Tools are already on the wire; check them for the next request
+                        self.link_verifier.verify_in_background(tool['link'] for tool in tools)
+                    result = {
+                        'query': query,
+                        'tools': tools,
+                        'total_found': len(tools),
+                        'source': f'AI-powered by {model}'
+                    }
+                    if complete:
+                        # A partial list would be served to every later caller until it expires
+                        self.cache_result('find_with_ai', cache_scope, query, result)
+                    yield {'event': 'done', 'data': {'query': query, 'total_found': len(tools), 'source': result['source']}}
+                    return
+            
+            logger.warning("AI stream failed, falling back to database search")
+            FALLBACKS.inc('find_with_ai_stream', 'models_failed')
         
-        # Try Anthropic Claude
+        result = cached if cached is not None else await self.recommend_tools_async(query)
+        for tool in result['tools']:
+            yield {'event': 'tool', 'data': tool}
+        yield {'event': 'done', 'data': {'query': query, 'total_found': result['total_found'], 'source': result.get('source')}}
+
+    def get_llm_providers(self) -> List[Tuple[str, Callable[[str], Awaitable[Optional[str]]]]]:
+        """Return (name, async query function) pairs for every configured LLM API"""
+        providers = []
+        if self.openai_api_key:
+            providers.append(("OpenAI GPT", self.query_openai_async))
         if self.anthropic_api_key:
-            try:
-                claude_response = self.query_anthropic(query)
-                if claude_response:
-                    responses.append(("Claude", claude_response))
-            except Exception as e:
-                print(f"Anthropic error: {e}")
-        
-        # Try DeepSeek (if available)
+            providers.append(("Claude", self.query_anthropic_async))
         if self.deepseek_api_key:
+            providers.append(("DeepSeek", self.query_deepseek_async))
+        return providers
+
+    def get_healthy_llm_providers(self) -> List[Tuple[str, Callable[[str], Awaitable[Optional[str]]]]]:
+        """Configured LLM APIs whose circuit breaker currently allows calls"""
+        healthy = []
+        for name, query_fn in self.get_llm_providers():
+            if self.health.allow(PROVIDER_KEYS[name]):
+                healthy.append((name, query_fn))
+            else:
+                logger.info("Skipping provider: circuit open", extra={'provider': PROVIDER_KEYS[name]})
+        return healthy
+
+    async def post_with_health(self, provider: str, model: str, url: str, **kwargs) -> ProviderResponse:
+        """POST to a provider with a latency-derived timeout, recording the outcome for its circuit breaker"""
+        await self.admission.admit(provider, self.admission_budget(provider, model))
+        started = time.monotonic()
+        try:
+            with timed('provider_call', provider, model):
+                response = await self.http.post(provider, url, timeout=self.health.timeout_for(provider, model), **kwargs)
+        except asyncio.CancelledError:
+            PROVIDER_CALLS.inc(provider, model, 'cancelled')
+            raise
+        except Exception:
+            self.health.record(provider, time.monotonic() - started, False, model)
+            PROVIDER_CALLS.inc(provider, model, 'error')
+            raise
+        self.health.record(provider, time.monotonic() - started, response.status_code == 200, model)
+        PROVIDER_CALLS.inc(provider, model, 'ok' if response.status_code == 200 else f'http_{response.status_code}')
+        return response
+
+    async def get_best_llm_response_with_source_async(self, query: str) -> Tuple[str, str]:
+        """Return the best LLM response together with the name of its source"""
+        providers = self.get_healthy_llm_providers()
+        
+        # Skip providers whose rate limit could not admit a call in time; if none
+        # is left, shed to the local catalog now rather than queueing
+        admissible = [
+            (name, query_fn) for name, query_fn in providers
+            if self.admission.has_capacity(PROVIDER_KEYS[name], self.admission_budget(PROVIDER_KEYS[name]))
+        ]
+        if providers and not admissible:
+            logger.warning("Upstream providers saturated, answering from the local catalog")
+            FALLBACKS.inc('recommend_tools', 'shed')
+            return await self.fallback_response_async(query), SHED_SOURCE
+        providers = admissible
+        
+        try:
+            if self.llm_fanout and len(providers) > 1:
+                result = await self.query_providers_concurrently(query, providers)
+            else:
+                result = await self.query_providers_sequentially(query, providers)
+        except AdmissionRejected as e:
+            logger.warning("%s; answering from the local catalog", e)
+            FALLBACKS.inc('recommend_tools', 'shed')
+            return await self.fallback_response_async(query), SHED_SOURCE
+        
+        if result:
+            return result
+        FALLBACKS.inc('recommend_tools', 'providers_failed' if providers else 'no_providers')
+        return await self.fallback_response_async(query), LOCAL_SOURCE
+
+    async def query_providers_sequentially(self, query: str, providers: List[Tuple[str, Callable]]) -> Optional[Tuple[str, str]]:
+        """Query providers one after another and return the first valid response within the LLM deadline.
+
+        Raises AdmissionRejected if none answered and at least one was shed.
+        """
+        deadline = time.monotonic() + self.llm_deadline
+        rejected = None
+        for index, (name, query_fn) in enumerate(providers):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning("LLM deadline of %ss reached, %d provider(s) not tried", self.llm_deadline, len(providers) - index)
+                break
             try:
-                deepseek_response = self.query_deepseek(query)
-                if deepseek_response:
-                    responses.append(("DeepSeek", deepseek_response))
+                response = await asyncio.wait_for(query_fn(query), remaining)
+                if response and self.has_valid_tools(response, PROVIDER_KEYS[name]):
+                    return response, name
+            except asyncio.TimeoutError:
+                logger.warning("LLM deadline of %ss reached", self.llm_deadline, extra={'provider': PROVIDER_KEYS[name]})
+                break
+            except AdmissionRejected as e:
+                logger.warning("%s", e, extra={'provider': PROVIDER_KEYS[name]})
+                rejected = e
             except Exception as e:
-                print(f"DeepSeek error: {e}")
+                logger.warning("Provider error: %s", e, extra={'provider': PROVIDER_KEYS[name]})
+        if rejected is not None:
+            raise rejected
+        return None
+
+    async def query_providers_concurrently(self, query: str, providers: List[Tuple[str, Callable]]) -> Optional[Tuple[str, str]]:
+        """Send the query to all providers at once; first valid response wins.
+
+        Raises AdmissionRejected if none answered and at least one was shed.
+        """
+        deadline = time.monotonic() + self.llm_deadline
+        rejected = None
+        tasks = {asyncio.ensure_future(query_fn(query)): name for name, query_fn in providers}
+        pending = set(tasks)
+        
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("LLM deadline of %ss reached, %d provider(s) still pending", self.llm_deadline, len(pending))
+                    break
+                
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = tasks[task]
+                    try:
+                        response = task.result()
+                    except AdmissionRejected as e:
+                        logger.warning("%s", e, extra={'provider': PROVIDER_KEYS[name]})
+                        rejected = e
+                        continue
+                    except Exception as e:
+                        logger.warning("Provider error: %s", e, extra={'provider': PROVIDER_KEYS[name]})
+                        continue
+                    if response and self.has_valid_tools(response, PROVIDER_KEYS[name]):
+                        logger.info("First valid response", extra={'provider': PROVIDER_KEYS[name]})
+                        return response, name
+        finally:
+            # Slower providers are cancelled so their connections go back to the pool
+            for task in pending:
+                task.cancel()
         
-        # Return the first successful response
-        if responses:
-            return responses[0][1]
-        else:
-            return self.fallback_response(query)
+        if rejected is not None:
+            raise rejected
+        return None
 
-    def query_openai(self, query: str) -> Optional[str]:
+    def has_valid_tools(self, response: str, provider: str = '') -> bool:
+        """Check whether an LLM response parses into at least one usable tool"""
+        return any(
+            isinstance(tool, dict) and all(key in tool for key in ['name', 'link', 'description'])
+            for tool in self.parse_llm_response(response, provider)
+        )
+
+    async def query_openai_async(self, query: str) -> Optional[str]:
         """Query OpenAI GPT API"""
         headers = {
             "Authorization": f"Bearer {self.openai_api_key}",
             "Content-Type": "application/json"
         }
         
-        prompt = f"""Find AI tools for this query: "{query}"
-        
-        Respond with a JSON list of tools in this exact format:
-        [
-            {{"name": "Tool Name", "link": "https://example.com", "description": "Brief description"}},
-            {{"name": "Tool Name 2", "link": "https://example2.com", "description": "Brief description"}}
-        ]
-        
-        Focus on actual AI tools and services that exist and are relevant to the query."""
-        
         data = {
             "model": "gpt-3.5-turbo",
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 1000,
+            "messages": self.recommend_prompt.messages(query),
+            "max_tokens": self.recommend_prompt.max_tokens,
             "temperature": 0.3
         }
         
         try:
-            response = requests.post("https://api.openai.com/v1/chat/completions", 
-                                   headers=headers, json=data, timeout=30)
+            response = await self.post_with_health('openai', data["model"], f"{self.openai_api_base}/chat/completions", 
+                                                   headers=headers, json=data)
             if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
+                body = response.json()
+                record_usage('openai', data["model"], body)
+                return body["choices"][0]["message"]["content"]
+        except AdmissionRejected:
+            raise  # shed, not failed: the caller answers with SHED_SOURCE
         except Exception as e:
-            print(f"OpenAI API error: {e}")
+            logger.warning("OpenAI API error: %s", e, extra={'provider': 'openai'})
             return None
 
-    def query_anthropic(self, query: str) -> Optional[str]:
+    async def query_anthropic_async(self, query: str) -> Optional[str]:
         """Query Anthropic Claude API"""
         headers = {
             "x-api-key": self.anthropic_api_key,
@@ -278,32 +741,27 @@ Remember: Return only the JSON array, no explanations or additional text."""
             "anthropic-version": "2023-06-01"
         }
         
-        prompt = f"""Find AI tools for this query: "{query}"
-        
-        Respond with a JSON list of tools in this exact format:
-        [
-            {{"name": "Tool Name", "link": "https://example.com", "description": "Brief description"}},
-            {{"name": "Tool Name 2", "link": "https://example2.com", "description": "Brief description"}}
-        ]
-        
-        Focus on actual AI tools and services that exist and are relevant to the query."""
-        
         data = {
             "model": "claude-3-sonnet-20240229",
-            "max_tokens": 1000,
-            "messages": [{"role": "user", "content": prompt}]
+            "max_tokens": self.recommend_prompt.max_tokens,
+            "system": self.recommend_prompt.system,
+            "messages": [{"role": "user", "content": self.recommend_prompt.user(query)}]
         }
         
         try:
-            response = requests.post("https://api.anthropic.com/v1/messages", 
-                                   headers=headers, json=data, timeout=30)
+            response = await self.post_with_health('anthropic', data["model"], f"{self.anthropic_api_base}/messages", 
+                                                   headers=headers, json=data)
             if response.status_code == 200:
-                return response.json()["content"][0]["text"]
+                body = response.json()
+                record_usage('anthropic', data["model"], body)
+                return body["content"][0]["text"]
+        except AdmissionRejected:
+            raise  # shed, not failed: the caller answers with SHED_SOURCE
         except Exception as e:
-            print(f"Anthropic API error: {e}")
+            logger.warning("Anthropic API error: %s", e, extra={'provider': 'anthropic'})
             return None
 
-    def query_deepseek(self, query: str) -> Optional[str]:
+    async def query_deepseek_async(self, query: str) -> Optional[str]:
         """Query DeepSeek API (placeholder - adjust URL based on actual API)"""
         # Note: This is a placeholder. Adjust the URL and headers based on actual DeepSeek API
         headers = {
@@ -311,79 +769,57 @@ Remember: Return only the JSON array, no explanations or additional text."""
             "Content-Type": "application/json"
         }
         
-        prompt = f"""Find AI tools for this query: "{query}"
-        
-        Respond with a JSON list of tools in this exact format:
-        [
-            {{"name": "Tool Name", "link": "https://example.com", "description": "Brief description"}},
-            {{"name": "Tool Name 2", "link": "https://example2.com", "description": "Brief description"}}
-        ]
-        
-        Focus on actual AI tools and services that exist and are relevant to the query."""
-        
         data = {
             "model": "deepseek-chat",
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": self.recommend_prompt.messages(query),
+            "max_tokens": self.recommend_prompt.max_tokens,
             "stream": False
         }
         
         try:
-            response = requests.post("https://api.deepseek.com/v1/chat/completions", 
-                                   headers=headers, json=data, timeout=30)
+            response = await self.post_with_health('deepseek', data["model"], f"{self.deepseek_api_base}/chat/completions", 
+                                                   headers=headers, json=data)
             if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
+                body = response.json()
+                record_usage('deepseek', data["model"], body)
+                return body["choices"][0]["message"]["content"]
+        except AdmissionRejected:
+            raise  # shed, not failed: the caller answers with SHED_SOURCE
         except Exception as e:
-            print(f"DeepSeek API error: {e}")
+            logger.warning("DeepSeek API error: %s", e, extra={'provider': 'deepseek'})
             return None
 
+    async def fallback_response_async(self, query: str) -> str:
+        """fallback_response on an executor thread: a catalog search (or the first
+        load of a large catalog) must not stall the upstream calls on the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.fallback_response, query)
+
     def fallback_response(self, query: str) -> str:
         """Fallback response using local database when APIs fail"""
-        query_lower = query.lower()
-        relevant_tools = []
-        
-        # Search through local database
-        for category, tools in self.ai_tools_database.items():
-            if any(keyword in query_lower for keyword in category.split('_')):
-                relevant_tools.extend(tools)
-        
-        # Generic search for common keywords
-        if not relevant_tools:
-            if any(word in query_lower for word in ['convert', 'csv', 'pdf', 'file']):
-                relevant_tools.extend(self.ai_tools_database.get('pdf_converter', []))
-                relevant_tools.extend(self.ai_tools_database.get('csv_tools', []))
-            elif any(word in query_lower for word in ['image', 'picture', 'photo', 'generate']):
-                relevant_tools.extend(self.ai_tools_database.get('image_generator', []))
-            elif any(word in query_lower for word in ['text', 'write', 'content']):
-                relevant_tools.extend(self.ai_tools_database.get('text_generator', []))
-            elif any(word in query_lower for word in ['code', 'programming', 'developer']):
-                relevant_tools.extend(self.ai_tools_database.get('code_assistant', []))
-            elif any(word in query_lower for word in ['video', 'edit', 'movie']):
-                relevant_tools.extend(self.ai_tools_database.get('video_editor', []))
-            elif any(word in query_lower for word in ['design', 'ui', 'graphic']):
-                relevant_tools.extend(self.ai_tools_database.get('design_tools', []))
-            elif any(word in query_lower for word in ['music', 'audio', 'sound']):
-                relevant_tools.extend(self.ai_tools_database.get('music_generator', []))
-        
-        # If still no results, return general AI tools
-        if not relevant_tools:
-            relevant_tools = self.ai_tools_database.get('text_generator', [])
-        
-        return json.dumps(relevant_tools[:5])  # Limit to top 5 results
-
-    def parse_llm_response(self, response: str) -> List[Dict]:
+        with timed('fallback', 'local'):
+            snapshot = self.catalog.snapshot()
+            
+            # Ranked search over the local database
+            relevant_tools = [record for _, record in snapshot.search_index.search(query, k=5, prefix=True, fuzzy=True)]
+            
+            # If still no results, return general AI tools
+            if not relevant_tools:
+                relevant_tools = snapshot.category('text_generator')
+            
+            return json.dumps([record.to_dict() for record in relevant_tools[:5]])  # Limit to top 5 results
+
+    def parse_llm_response(self, response: str, provider: str = '') -> List[Dict]:
         """Parse LLM response to extract tools"""
         try:
-            # Try to find JSON in the response
-            json_match = re.search(r'\[.*\]', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                tools = json.loads(json_str)
-                return tools
-            else:
+            with timed('parse', provider):
+                # First balanced JSON array of tools, ignoring fences and prose
+                tools = extract_json_array(response)
+                if tools is not None:
+                    return expand_tools(tools)
                 # If no JSON found, try to parse manually
                 return self.manual_parse_response(response)
         except Exception as e:
-            print(f"Parsing error: {e}")
+            logger.warning("Parsing error: %s", e, extra={'provider': provider})
             return []
 
     def manual_parse_response(self, response: str) -> List[Dict]:
@@ -393,14 +829,17 @@ Remember: Return only the JSON array, no explanations or additional text."""
         
         current_tool = {}
         for line in lines:
-            if 'name:' in line.lower() or 'tool:' in line.lower():
+            if ':' not in line:
+                continue
+            lowered = line.lower()
+            if 'name:' in lowered or 'tool:' in lowered:
                 if current_tool:
                     tools.append(current_tool)
                     current_tool = {}
                 current_tool['name'] = line.split(':', 1)[1].strip()
-            elif 'link:' in line.lower() or 'url:' in line.lower():
+            elif 'link:' in lowered or 'url:' in lowered:
                 current_tool['link'] = line.split(':', 1)[1].strip()
-            elif 'description:' in line.lower():
+            elif 'description:' in lowered:
                 current_tool['description'] = line.split(':', 1)[1].strip()
         
         if current_tool:
@@ -408,35 +847,157 @@ Remember: Return only the JSON array, no explanations or additional text."""
         
         return tools
 
-    def recommend_tools(self, query: str) -> Dict:
+    async def recommend_tools_async(self, query: str) -> Dict:
         """Main function to get AI tool recommendations"""
-        print(f"🔍 Searching for AI tools related to: '{query}'")
-        print("⏳ Please wait while I query the best AI models...")
+        ensure_trace_id()
+        
+        # Concurrent identical queries share one upstream round-trip
+        result = await self.single_flight.do(
+            ('recommend_tools', normalize_query(query)),
+            lambda: self._recommend_tools_async(query)
+        )
+        result = await self.verify_links(result)
+        return dict(result, query=query)
+
+    async def _recommend_tools_async(self, query: str, refresh: bool = False) -> Dict:
+        logger.info("Searching for AI tools", extra={'query': query})
+        
+        cache_scope = self.cache_scope('recommend_tools')
+        cached = None if refresh else self.get_cached_result('recommend_tools', cache_scope, query)
+        if cached is not None:
+            return cached
+        
+        logger.info("Querying LLM providers")
         
         # Get response from the best available LLM
-        llm_response = self.get_best_llm_response(query)
+        llm_response, source = await self.get_best_llm_response_with_source_async(query)
+        provider = PROVIDER_KEYS.get(source, 'local')
         
         # Parse the response
-        tools = self.parse_llm_response(llm_response)
+        tools = self.parse_llm_response(llm_response, provider)
         
         # Validate and clean the results
-        validated_tools = []
-        for tool in tools:
-            if isinstance(tool, dict) and all(key in tool for key in ['name', 'link', 'description']):
-                validated_tools.append({
-                    'name': tool['name'],
-                    'link': tool['link'],
-                    'description': tool['description'][:100] + '...' if len(tool['description']) > 100 else tool['description']
-                })
-        
-        return {
+        with timed('validate', provider):
+            validated_tools = []
+            for tool in tools:
+                if isinstance(tool, dict) and all(key in tool for key in ['name', 'link', 'description']):
+                    validated_tools.append({
+                        'name': tool['name'],
+                        'link': tool['link'],
+                        'description': tool['description'][:100] + '...' if len(tool['description']) > 100 else tool['description']
+                    })
+        
+        result = {
             'query': query,
             'tools': validated_tools,
-            'total_found': len(validated_tools)
+            'total_found': len(validated_tools),
+            'source': source if source in (LOCAL_SOURCE, SHED_SOURCE) else f'AI-powered by {source}'
         }
+        
+        # Only cache real LLM answers; local fallbacks should retry upstream next time
+        if validated_tools and source not in (LOCAL_SOURCE, SHED_SOURCE):
+            self.cache_result('recommend_tools', cache_scope, query, result)
+        
+        return result
+
+    # Synchronous API for the CLI and other blocking callers
+
+    def close(self) -> None:
+        """Close pooled upstream connections and stop the background event loop"""
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+        self.runtime.run(self.http.close())
+        self.runtime.close()
+
+    def query_github_models(self, query: str, model: str = "gpt-4o-mini") -> Optional[str]:
+        """Query GitHub Models API (blocking)"""
+        return self.runtime.run(self.query_github_models_async(query, model))
+
+    def query_openai(self, query: str) -> Optional[str]:
+        """Query OpenAI GPT API (blocking)"""
+        return self.runtime.run(self.query_openai_async(query))
+
+    def query_anthropic(self, query: str) -> Optional[str]:
+        """Query Anthropic Claude API (blocking)"""
+        return self.runtime.run(self.query_anthropic_async(query))
+
+    def query_deepseek(self, query: str) -> Optional[str]:
+        """Query DeepSeek API (blocking)"""
+        return self.runtime.run(self.query_deepseek_async(query))
+
+    def get_best_llm_response(self, query: str) -> str:
+        """Try different LLM APIs and return the best response"""
+        return self.runtime.run(self.get_best_llm_response_with_source_async(query))[0]
+
+    def find_with_ai(self, query: str) -> Dict:
+        """Find AI tools using GitHub Models API"""
+        return self.runtime.run(self.find_with_ai_async(query))
+
+    def recommend_tools(self, query: str) -> Dict:
+        """Main function to get AI tool recommendations"""
+        return self.runtime.run(self.recommend_tools_async(query))
+
+def wait_for_rate_limits(system: AIToolRecommendationSystem, spec: str = '') -> None:
+    """Make offline runs wait for rate-limit tokens instead of shedding to the local catalog"""
+    rate_limits = parse_rate_limits(spec) if spec else system.admission.rate_limits
+    system.admission.set_rate_limits({})
+    system.http.set_rate_limits(rate_limits)
+
+def run_batch_cli(args) -> None:
+    """Run an offline JSONL batch and write results with checkpointing"""
+    system = AIToolRecommendationSystem()
+    wait_for_rate_limits(system, args.rate_limit)
+    
+    print(f"📦 Running batch: {args.batch} -> {args.output}")
+    try:
+        summary = system.runtime.run(run_batch(system, args.batch, args.output, args.mode, args.concurrency))
+    finally:
+        system.close()
+    print(f"✅ Batch finished: {summary['completed']} completed, "
+          f"{summary['errors']} errors, {summary['fallbacks']} local fallbacks, {summary['skipped']} already done")
+    if summary['errors'] or summary['fallbacks']:
+        print("↻ Re-run the same command to retry errors and local fallbacks")
+
+def run_warm_cli(args) -> None:
+    """Warm the result cache once from a query log, e.g. before switching traffic to a deploy"""
+    system = AIToolRecommendationSystem()
+    wait_for_rate_limits(system, args.rate_limit)
+    log_path = args.warm or os.getenv('QUERY_LOG_PATH', '.cache/query_log.jsonl')
+    warmer = CacheWarmer(
+        system, log_path,
+        top_n=int(os.getenv('CACHE_WARM_TOP_N', '50')),
+        concurrency=args.concurrency,
+        max_calls=int(os.getenv('CACHE_WARM_MAX_CALLS', '100'))
+    )
+    print(f"🔥 Warming cache from {log_path}")
+    try:
+        run = system.runtime.run(warmer.warm_once())
+    finally:
+        system.close()
+    print(f"✅ Warm-up finished: {run['warmed']} refreshed, {run['fresh']} already fresh, "
+          f"{run['over_budget']} over budget, {run['errors']} errors, {run['calls']} upstream calls")
 
 def main():
     """Main function to run the AI recommendation system"""
+    parser = argparse.ArgumentParser(description="AI Tool Recommendation System")
+    parser.add_argument('--batch', metavar='QUERIES_JSONL', help="run every query in a JSONL file instead of the interactive prompt")
+    parser.add_argument('--output', default='batch_results.jsonl', help="JSONL file to append results to (also the resume checkpoint)")
+    parser.add_argument('--mode', choices=BATCH_MODES, default='recommend', help="which search to run for each query")
+    parser.add_argument('--concurrency', type=int, default=8, help="queries in flight at once")
+    parser.add_argument('--rate-limit', default='', help="per-provider requests/sec, e.g. 'github=2,openai=5'")
+    parser.add_argument('--warm', nargs='?', const='', metavar='QUERY_LOG',
+                        help="pre-warm the cache from a query log (default QUERY_LOG_PATH) and exit")
+    args = parser.parse_args()
+    
+    configure_logging(os.getenv('LOG_LEVEL', 'INFO'), os.getenv('LOG_FORMAT', 'text'))
+    
+    if args.batch:
+        run_batch_cli(args)
+        return
+    if args.warm is not None:
+        run_warm_cli(args)
+        return
+    
     print("🤖 AI Tool Recommendation System")
     print("=" * 50)
     
@@ -0,0 +1,310 @@
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+INF_BUCKET = 'le="+Inf"'
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with positional label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def items(self) -> List[Tuple[Tuple[str, ...], float]]:
+        """Snapshot of (label values, count) pairs"""
+        with self._lock:
+            return list(self._values.items())
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and three additions under a lock"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}  # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, INF_BUCKET)} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {repr(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class Collector:
+    """Gauge read from a callback at scrape time, e.g. circuit state or cache size"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], read: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.read = read
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self.read().items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, name: str, help: str, labelnames: Sequence[str],
+                  read: Callable[[], Dict[Tuple[str, ...], float]]) -> Collector:
+        """Register (or replace) a gauge computed at scrape time"""
+        collector = Collector(name, help, labelnames, read)
+        with self._lock:
+            self._metrics[name] = collector
+        return collector
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'ai_tools_stage_seconds', 'Time spent in each pipeline stage', ('stage', 'provider', 'model'))
+PROVIDER_CALLS = REGISTRY.counter(
+    'ai_tools_provider_calls_total', 'Upstream provider calls by outcome', ('provider', 'model', 'outcome'))
+TOKENS = REGISTRY.counter(
+    'ai_tools_tokens_total', 'Tokens reported by provider responses', ('provider', 'model', 'kind'))
+COMPLETIONS = REGISTRY.counter(
+    'ai_tools_completions_total', 'Provider responses that reported token usage', ('provider', 'model'))
+TRUNCATED = REGISTRY.counter(
+    'ai_tools_truncated_completions_total', 'Completions cut off by their max_tokens cap', ('provider', 'model'))
+CACHE_LOOKUPS = REGISTRY.counter(
+    'ai_tools_cache_lookups_total', 'Result cache lookups by tier and outcome', ('endpoint', 'tier', 'outcome'))
+FALLBACKS = REGISTRY.counter(
+    'ai_tools_fallbacks_total', 'Requests answered from the local database, by reason', ('endpoint', 'reason'))
+LINK_CHECKS = REGISTRY.counter(
+    'ai_tools_link_checks_total', 'Tool link checks by outcome (alive, dead, unknown, skipped, cached)', ('outcome',))
+ADMISSIONS = REGISTRY.counter(
+    'ai_tools_admissions_total', 'Provider call admission outcomes (admitted, queued, queue_full, deadline)',
+    ('provider', 'outcome'))
+REQUEST_SECONDS = REGISTRY.histogram(
+    'ai_tools_http_request_seconds', 'HTTP request latency (time to response headers)', ('endpoint', 'method', 'status'))
+
+
+@contextmanager
+def timed(stage: str, provider: str = '', model: str = ''):
+    """Record the duration of the enclosed block under ai_tools_stage_seconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage, provider, model)
+
+
+def record_usage(provider: str, model: str, body: Dict) -> None:
+    """Count prompt/completion tokens from an OpenAI- or Anthropic-style usage block,
+    and completions that stopped at max_tokens"""
+    if not isinstance(body, dict):
+        return
+    choices = body.get('choices')
+    finish = choices[0].get('finish_reason') if isinstance(choices, list) and choices and isinstance(choices[0], dict) else None
+    if finish == 'length' or body.get('stop_reason') == 'max_tokens':
+        TRUNCATED.inc(provider, model)
+    usage = body.get('usage')
+    if not isinstance(usage, dict):
+        return
+    COMPLETIONS.inc(provider, model)
+    prompt = usage.get('prompt_tokens', usage.get('input_tokens'))
+    completion = usage.get('completion_tokens', usage.get('output_tokens'))
+    if isinstance(prompt, int):
+        TOKENS.inc(provider, model, 'prompt', amount=prompt)
+    if isinstance(completion, int):
+        TOKENS.inc(provider, model, 'completion', amount=completion)
+
+
+def usage_report() -> Dict[str, Dict]:
+    """Token totals per provider, with the average completion size and truncated completions"""
+    report: Dict[str, Dict] = {}
+    for (provider, model, kind), value in TOKENS.items():
+        entry = report.setdefault(provider, {'prompt': 0, 'completion': 0, 'responses': 0, 'truncated': 0})
+        entry[kind] += int(value)
+    for (provider, model), value in COMPLETIONS.items():
+        if provider in report:
+            report[provider]['responses'] += int(value)
+    for (provider, model), value in TRUNCATED.items():
+        if provider in report:
+            report[provider]['truncated'] += int(value)
+    for entry in report.values():
+        responses = entry['responses']
+        entry['completion_per_response'] = round(entry['completion'] / responses, 1) if responses else None
+    return report
+
+
+# Per-request trace IDs, carried through asyncio tasks by contextvars
+
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('trace_id', default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+def set_trace_id(trace_id: Optional[str] = None) -> str:
+    """Start a trace for the current context, generating an ID if none is given"""
+    trace_id = trace_id or uuid.uuid4().hex[:16]
+    _trace_id.set(trace_id)
+    return trace_id
+
+
+def ensure_trace_id() -> str:
+    return _trace_id.get() or set_trace_id()
+
+
+class TraceIdFilter(logging.Filter):
+    """Stamp each record with the trace ID of the context that logged it"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = _trace_id.get() or '-'
+        return True
+
+
+_STANDARD_ATTRS = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime', 'trace_id'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the trace ID and any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'trace_id': getattr(record, 'trace_id', '-'),
+            'msg': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging(level: str = 'INFO', fmt: str = 'json') -> None:
+    """Route all logging through a queue to a stdout writer thread.
+
+    Callers on the hot path only enqueue the record, so a slow or blocked
+    stdout cannot stall request handling. `fmt` is 'json' or 'text'.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    if fmt == 'text':
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s'))
+    else:
+        handler.setFormatter(JsonFormatter())
+    records = queue.SimpleQueue()
+    queue_handler = QueueHandler(records)
+    queue_handler.addFilter(TraceIdFilter())
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,61 @@
+import json
+import math
+from typing import Dict, List, Optional
+
+# Compact output schema: short keys cut roughly a fifth of every completion
+SHORT_KEYS = {'n': 'name', 'u': 'link', 'd': 'description'}
+
+# Conservative characters per token for English prose and URLs
+CHARS_PER_TOKEN = 3
+# Tokens per tool for JSON punctuation and keys: {"n":"","u":"","d":""},
+TOOL_OVERHEAD_TOKENS = 12
+# Headroom so a slightly long answer is not cut off mid-array
+CAP_HEADROOM = 1.25
+
+
+class ToolPrompt:
+    """Prompt asking for a fixed number of tools in the compact schema, built once per shape.
+
+    The instructions are rendered when the prompt is created; per call only
+    the JSON-quoted query is appended. `max_tokens` is derived from the tool
+    count and field limits, so the completion cap shrinks with the request.
+    """
+
+    def __init__(self, count: int = 5, name_chars: int = 40, link_chars: int = 60, description_chars: int = 100):
+        self.count = count
+        self.name_chars = name_chars
+        self.link_chars = link_chars
+        self.description_chars = description_chars
+        self.system = (
+            "You recommend real, currently available AI tools. "
+            "Reply with a JSON array only: no markdown, no prose."
+        )
+        self._prefix = (
+            f"Return exactly {count} AI tools for the query, most relevant first, from different vendors, "
+            f"as [{{\"n\":name,\"u\":homepage URL,\"d\":description}}]. "
+            f"n at most {name_chars} chars, u a real https URL, d one sentence of at most {description_chars} chars.\n"
+            "Query: "
+        )
+        per_tool = TOOL_OVERHEAD_TOKENS + (name_chars + link_chars + description_chars) / CHARS_PER_TOKEN
+        self.max_tokens = math.ceil((count * per_tool + 4) * CAP_HEADROOM)
+
+    def user(self, query: str) -> str:
+        # JSON quoting keeps quotes or newlines in the query from breaking out of it
+        return self._prefix + json.dumps(query, ensure_ascii=False)
+
+    def messages(self, query: str) -> List[Dict]:
+        """Chat messages for OpenAI-style APIs (GitHub Models, OpenAI, DeepSeek)"""
+        return [{'role': 'system', 'content': self.system}, {'role': 'user', 'content': self.user(query)}]
+
+
+def expand_tool(item) -> Optional[Dict]:
+    """Map a compact-schema tool back to name/link/description; long keys pass through"""
+    if not isinstance(item, dict):
+        return item
+    if not any(key in item for key in SHORT_KEYS):
+        return item
+    return {SHORT_KEYS.get(key, key): value for key, value in item.items()}
+
+
+def expand_tools(items) -> List:
+    return [expand_tool(item) for item in items]
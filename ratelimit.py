@@ -0,0 +1,63 @@
+import time
+import asyncio
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `burst` tokens.
+
+    Meant to be used from a single event loop; acquire() waits for a token.
+    wait_time() only reads the bucket, so other threads may call it for stats.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _available(self, now: float) -> float:
+        return min(self.burst, self._tokens + (now - self._updated) * self.rate)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = self._available(now)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now"""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """Seconds until the next token is available"""
+        tokens = self._available(time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it; callers are served in order"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while not self.try_acquire():
+                await asyncio.sleep(self.wait_time())
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    """Parse 'github=2,openai=5' into {provider: requests per second}"""
+    limits = {}
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        provider, rate = item.split('=', 1)
+        try:
+            value = float(rate)
+        except ValueError:
+            continue
+        if value > 0:
+            limits[provider.strip()] = value
+    return limits
@@ -0,0 +1,194 @@
+import re
+import math
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Words that appear in nearly every query or tool and carry no ranking signal
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'ai', 'for', 'i', 'in', 'into', 'is', 'it', 'me', 'my',
+    'of', 'on', 'or', 'the', 'to', 'tool', 'tools', 'with', 'want', 'need'
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stop words and fold plurals"""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+_ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+
+def _edits(term: str) -> Set[str]:
+    """Every string one deletion, adjacent transposition, substitution or insertion away"""
+    splits = [(term[:i], term[i:]) for i in range(len(term) + 1)]
+    edits = {left + right[1:] for left, right in splits if right}
+    edits.update(left + right[1] + right[0] + right[2:] for left, right in splits if len(right) > 1)
+    edits.update(left + char + right[1:] for left, right in splits if right for char in _ALPHABET)
+    edits.update(left + char + right for left, right in splits for char in _ALPHABET)
+    edits.discard(term)
+    return edits
+
+
+class ToolSearchIndex:
+    """Inverted index over tool name, description and category with BM25 ranking.
+
+    finalize() packs every posting into flat NumPy arrays: each term's
+    document ids in order, their precomputed BM25 term-frequency factors,
+    and the order that sorts them best first. search() is Fagin's threshold
+    algorithm: it reads the best `scan_depth` postings of each query term,
+    scores those candidates exactly by binary search in the other terms'
+    lists, and stops once the k-th score beats what any unread document
+    could reach, reading deeper otherwise. Results equal a full scan, but a
+    common term rarely costs more than its first few hundred postings.
+    Typos are matched by generating a query token's one-edit variants and
+    looking them up, so fuzzy search costs no index memory.
+    """
+
+    FIELD_WEIGHTS = {'name': 2.0, 'category': 1.5, 'description': 1.0}
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, scan_depth: int = 128):
+        self.k1 = k1
+        self.b = b
+        self.scan_depth = scan_depth
+        self.docs: List = []
+        self._pending: Dict[str, Tuple[array, array]] = defaultdict(lambda: (array('i'), array('f')))
+        self._spans: Dict[str, Tuple[int, int]] = {}
+        self._doc_ids = np.zeros(0, dtype=np.int32)
+        self._impacts = np.zeros(0, dtype=np.float32)
+        self._order = np.zeros(0, dtype=np.int32)
+        self._doc_lengths = array('f')
+        self._idf: Dict[str, float] = {}
+        self._vocabulary: List[str] = []
+        self._avg_length = 0.0
+
+    @classmethod
+    def from_records(cls, records: Iterable, category_keywords: Optional[Dict[str, Iterable[str]]] = None) -> 'ToolSearchIndex':
+        """Build an index from catalog records with name, description and category attributes"""
+        index = cls()
+        category_keywords = category_keywords or {}
+        category_texts = {}
+        for record in records:
+            category_text = category_texts.get(record.category)
+            if category_text is None:
+                category_text = ' '.join([record.category.replace('_', ' ')] + list(category_keywords.get(record.category, ())))
+                category_texts[record.category] = category_text
+            index.add(record, record.name, record.description, category_text)
+        index.finalize()
+        return index
+
+    def add(self, doc, name: str, description: str, category_text: str = '') -> int:
+        """Add one tool document; call finalize() once all tools are added"""
+        doc_id = len(self.docs)
+        self.docs.append(doc)
+        weights = defaultdict(float)
+        fields = {'name': name, 'description': description, 'category': category_text}
+        for field, text in fields.items():
+            for term in tokenize(text):
+                weights[term] += self.FIELD_WEIGHTS[field]
+        for term, weight in weights.items():
+            doc_ids, tfs = self._pending[term]
+            doc_ids.append(doc_id)
+            tfs.append(weight)
+        self._doc_lengths.append(sum(weights.values()))
+        return doc_id
+
+    def finalize(self) -> None:
+        """Precompute IDF, the sorted vocabulary for prefix search and impact-ordered postings"""
+        total = len(self.docs)
+        self._vocabulary = sorted(self._pending)
+        self._idf = {
+            term: math.log(1 + (total - len(self._pending[term][0]) + 0.5) / (len(self._pending[term][0]) + 0.5))
+            for term in self._vocabulary
+        }
+        lengths = np.frombuffer(self._doc_lengths, dtype=np.float32)
+        self._avg_length = float(lengths.mean()) if total else 0.0
+        norms = self.k1 * (1 - self.b + self.b * lengths / (self._avg_length or 1.0))
+        size = sum(len(doc_ids) for doc_ids, _ in self._pending.values())
+        self._doc_ids = np.empty(size, dtype=np.int32)
+        self._impacts = np.empty(size, dtype=np.float32)
+        self._order = np.empty(size, dtype=np.int32)
+        offset = 0
+        for term in self._vocabulary:
+            doc_ids, tfs = self._pending.pop(term)
+            doc_ids = np.frombuffer(doc_ids, dtype=np.int32)
+            tfs = np.frombuffer(tfs, dtype=np.float32)
+            impacts = tfs * (self.k1 + 1) / (tfs + norms[doc_ids])
+            end = offset + len(doc_ids)
+            # Documents are added in id order, so each span is sorted by id for binary search
+            self._doc_ids[offset:end] = doc_ids
+            self._impacts[offset:end] = impacts
+            self._order[offset:end] = offset + np.argsort(-impacts, kind='stable')
+            self._spans[term] = (offset, end)
+            offset = end
+
+    def _expand(self, token: str, prefix: bool, fuzzy: bool) -> List[Tuple[str, float]]:
+        """Map a query token to (index term, weight) pairs"""
+        if token in self._spans:
+            terms = [(token, 1.0)]
+        else:
+            terms = []
+            if fuzzy and len(token) >= 4:
+                terms.extend((term, 0.5) for term in _edits(token) if term in self._spans)
+        if prefix and len(token) >= 2:
+            start = bisect_left(self._vocabulary, token)
+            for term in self._vocabulary[start:start + 20]:
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    terms.append((term, 0.8))
+        return terms
+
+    def search(self, query: str, k: int = 5, prefix: bool = False, fuzzy: bool = False) -> List[Tuple[float, object]]:
+        """Return the top-k (score, document) pairs for a query.
+
+        Each query token scores a document by its best-matching index term,
+        so a typo or prefix counts once however many variants a tool contains.
+        """
+        tokens = []
+        for token in set(tokenize(query)):
+            terms = [(self._spans[term], self._idf[term] * boost) for term, boost in self._expand(token, prefix, fuzzy)]
+            if terms:
+                tokens.append(terms)
+        if not tokens:
+            return []
+        depth = self.scan_depth
+        while True:
+            # Sorted access: the best `depth` postings of every term, and the most an unread one adds
+            seen, unread = [], 0.0
+            for terms in tokens:
+                best_unread = 0.0
+                for (start, end), weight in terms:
+                    stop = min(end, start + depth)
+                    seen.append(self._doc_ids[self._order[start:stop]])
+                    if stop < end:
+                        best_unread = max(best_unread, weight * float(self._impacts[self._order[stop]]))
+                unread += best_unread
+            candidates = np.sort(np.concatenate(seen))
+            candidates = candidates[np.concatenate(([True], candidates[1:] != candidates[:-1]))]
+            # Random access: each candidate's exact score, found by binary search in every term
+            scores = np.zeros(len(candidates))
+            for terms in tokens:
+                token_scores = np.zeros(len(candidates))
+                for (start, end), weight in terms:
+                    doc_ids = self._doc_ids[start:end]
+                    positions = np.minimum(np.searchsorted(doc_ids, candidates), len(doc_ids) - 1)
+                    found = doc_ids[positions] == candidates
+                    np.maximum(token_scores, np.where(found, self._impacts[start:end][positions] * weight, 0.0), out=token_scores)
+                scores += token_scores
+            top = np.argsort(-scores, kind='stable')[:k]
+            if not unread or (len(top) == k and scores[top[-1]] >= unread):
+                return [(float(scores[i]), self.docs[int(candidates[i])]) for i in top]
+            depth *= 4
@@ -0,0 +1,218 @@
+import re
+import json
+import time
+import zlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from search_index import tokenize
+
+
+class QueryVectorizer:
+    """Hashed word, word-pair and character-trigram features, L2-normalized.
+
+    Stop words and plurals are folded the same way as the local search index,
+    and common suffixes are dropped, so "convert csv to pdf" and
+    "csv → pdf converter" land close together.
+    """
+
+    # Verbs folded onto "convert" so "turn csv into pdf" matches "convert csv to pdf"
+    SYNONYMS = {'turn': 'convert', 'transform': 'convert', 'conversion': 'convert'}
+    # Spelled out before tokenizing drops them, so "c++" and "c#" stay apart from "c"
+    SYMBOLS = {'++': 'pp', '#': 'sharp'}
+    _SYMBOL = re.compile(r'(?<=\w)(\+\+|#)')
+
+    def __init__(self, dim: int = 128, ngram: int = 3):
+        self.dim = dim
+        self.ngram = ngram
+
+    @staticmethod
+    def fold_suffix(token: str) -> str:
+        for suffix in ('ing', 'er', 'ed'):
+            if len(token) > len(suffix) + 3 and token.endswith(suffix):
+                return token[:-len(suffix)]
+        return token
+
+    def terms(self, query: str) -> List[str]:
+        """Folded content words in query order"""
+        query = self._SYMBOL.sub(lambda match: self.SYMBOLS[match.group()], query)
+        return [self.SYNONYMS.get(token, self.fold_suffix(token)) for token in tokenize(query)]
+
+    def features(self, query: str) -> List[Tuple[str, float]]:
+        tokens = self.terms(query)
+        features = []
+        # Ordered word pairs pull "csv to pdf" and "pdf to csv" apart; order_conflict() keeps them apart
+        for first, second in zip(tokens, tokens[1:]):
+            features.append((f'b:{first}>{second}', 1.5))
+        for token in tokens:
+            features.append(('w:' + token, 1.0))
+            padded = f' {token} '
+            for i in range(max(1, len(padded) - self.ngram + 1)):
+                features.append(('c:' + padded[i:i + self.ngram], 0.5))
+        return features
+
+    def vectorize(self, query: str) -> Optional[np.ndarray]:
+        """Return a unit vector for the query, or None if it has no usable terms"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self.features(query):
+            hashed = zlib.crc32(feature.encode('utf-8'))
+            # The top bit picks the sign so collisions tend to cancel out
+            vector[hashed % self.dim] += weight if hashed & 0x80000000 else -weight
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+
+def order_conflict(first: Tuple[str, ...], second: Tuple[str, ...]) -> bool:
+    """Whether a pair of adjacent words in one query appears reversed in the other.
+
+    "text to speech" and "speech to text" share every word, so their vectors
+    are close, but they ask for opposite tools. Words that merely move
+    ("csv to pdf converter" for "convert csv to pdf") are not a conflict.
+    """
+    pairs = set(zip(first, first[1:]))
+    return any((b, a) in pairs for a, b in zip(second, second[1:]) if a != b)
+
+
+def term_conflict(first: Tuple[str, ...], second: Tuple[str, ...]) -> bool:
+    """Whether each query has a content word the other lacks.
+
+    "remove background from image" and "remove background from video" are
+    close in vector space but want different tools. One query adding words
+    to the other ("text to speech free") is a refinement, not a conflict.
+    """
+    first_terms, second_terms = set(first), set(second)
+    return bool(first_terms - second_terms) and bool(second_terms - first_terms)
+
+
+class SemanticCache:
+    """Approximate result cache that serves near-duplicate queries.
+
+    Query vectors live in a preallocated NumPy matrix used as a ring buffer,
+    so the oldest entry is evicted once `max_size` is reached. Up to
+    `exact_scan_limit` entries every lookup is one exact cosine-similarity
+    product over the whole matrix. Beyond that, random-hyperplane LSH tables
+    narrow each lookup to at most tables * bucket_scan candidates, so lookup
+    cost stops growing with the number of entries. Recall then becomes
+    probabilistic: most pairs at cosine 0.9 are found, fewer near the
+    threshold. A miss only costs an upstream call, while a false hit would
+    serve the wrong tools, so a candidate whose shared words come in a
+    different order ("speech to text" for "text to speech"), or that swaps a
+    word for another ("video" for "image"), never matches.
+    """
+
+    def __init__(self, max_size: int = 100000, threshold: float = 0.75, ttl: float = 3600,
+                 dim: int = 128, tables: int = 12, bits: int = 14, bucket_scan: int = 64,
+                 exact_scan_limit: int = 20000, seed: int = 13):
+        self.max_size = max_size
+        self.bucket_scan = bucket_scan
+        self.exact_scan_limit = exact_scan_limit
+        self.threshold = threshold
+        self.ttl = ttl
+        self.vectorizer = QueryVectorizer(dim)
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((tables, bits, dim)).astype(np.float32)
+        self._powers = (1 << np.arange(bits)).astype(np.int64)
+        self._vectors = np.zeros((max_size, dim), dtype=np.float32)
+        self._expires = np.zeros(max_size, dtype=np.float64)
+        self._namespaces = np.full(max_size, -1, dtype=np.int32)
+        self._signatures = np.zeros((max_size, tables), dtype=np.int64)
+        self._payloads: List[Optional[str]] = [None] * max_size
+        self._terms: List[Optional[Tuple[str, ...]]] = [None] * max_size
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(tables)]
+        self._namespace_ids: Dict[str, int] = {}
+        self._next_slot = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _signature(self, vector: np.ndarray) -> np.ndarray:
+        bits = (self._planes @ vector) > 0
+        return bits.astype(np.int64) @ self._powers
+
+    def get(self, namespace: str, query: str) -> Optional[Dict]:
+        """Return the result cached for the most similar earlier query above the threshold"""
+        vector = self.vectorizer.vectorize(query)
+        with self._lock:
+            namespace_id = self._namespace_ids.get(namespace)
+            if vector is None or namespace_id is None:
+                self._stats['misses'] += 1
+                return None
+
+            now = time.time()
+            if self._size <= self.exact_scan_limit:
+                # Small caches are scanned exhaustively. The ring buffer fills slots
+                # 0..size-1 in order, so this is a contiguous view, not a copy
+                size = self._size
+                scores = self._vectors[:size] @ vector
+                valid = (scores >= self.threshold) & (self._namespaces[:size] == namespace_id) & (self._expires[:size] > now)
+                slots = np.flatnonzero(valid)
+                scores = scores[slots]
+            else:
+                signature = self._signature(vector)
+                candidates = []
+                for table, bucket in enumerate(signature):
+                    # Only the newest entries of a crowded bucket are scanned, bounding lookup cost
+                    candidates.extend(self._buckets[table].get(int(bucket), ())[-self.bucket_scan:])
+                slots = np.unique(np.array(candidates, dtype=np.int64))
+                if slots.size:
+                    slots = slots[(self._namespaces[slots] == namespace_id) & (self._expires[slots] > now)]
+                scores = self._vectors[slots] @ vector
+                keep = scores >= self.threshold
+                slots, scores = slots[keep], scores[keep]
+
+            terms = tuple(self.vectorizer.terms(query))
+            for index in np.argsort(-scores):
+                slot = int(slots[index])
+                if not order_conflict(terms, self._terms[slot]) and not term_conflict(terms, self._terms[slot]):
+                    self._stats['hits'] += 1
+                    return json.loads(self._payloads[slot])
+
+            self._stats['misses'] += 1
+            return None
+
+    def set(self, namespace: str, query: str, value: Dict) -> None:
+        """Remember a result under the query's vector, evicting the oldest entry when full"""
+        vector = self.vectorizer.vectorize(query)
+        if vector is None:
+            return
+        payload = json.dumps(value)
+        with self._lock:
+            namespace_id = self._namespace_ids.setdefault(namespace, len(self._namespace_ids))
+            slot = self._next_slot
+            self._next_slot = (slot + 1) % self.max_size
+            if self._payloads[slot] is not None:
+                self._remove(slot)
+                self._stats['evictions'] += 1
+            else:
+                self._size += 1
+
+            signature = self._signature(vector)
+            self._vectors[slot] = vector
+            self._expires[slot] = time.time() + self.ttl
+            self._namespaces[slot] = namespace_id
+            self._signatures[slot] = signature
+            self._payloads[slot] = payload
+            self._terms[slot] = tuple(self.vectorizer.terms(query))
+            for table, bucket in enumerate(signature):
+                self._buckets[table].setdefault(int(bucket), []).append(slot)
+
+    def _remove(self, slot: int) -> None:
+        for table, bucket in enumerate(self._signatures[slot]):
+            members = self._buckets[table].get(int(bucket))
+            if members is not None:
+                members.remove(slot)
+                if not members:
+                    del self._buckets[table][int(bucket)]
+        self._payloads[slot] = None
+        self._terms[slot] = None
+        self._namespaces[slot] = -1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,77 @@
+import os
+import queue
+import atexit
+import logging
+import sqlite3
+import threading
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Reads run on request paths (often the event loop thread); in WAL mode they
+# only wait during a checkpoint, so a short timeout bounds the rare stall
+READ_BUSY_TIMEOUT = 0.1
+
+
+def open_shared_db(path: str, busy_timeout: float = 5.0) -> sqlite3.Connection:
+    """Open a SQLite file that several worker processes on one node read and write.
+
+    WAL mode lets readers proceed while one process writes, and the busy
+    timeout makes concurrent writers wait for the lock instead of failing.
+    The connection is in autocommit mode and may be shared between threads
+    as long as callers serialize access to it.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=busy_timeout)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+class WriteBehind:
+    """One background thread that applies writes to a shared SQLite file, in order.
+
+    `submit` queues a function of the writer's connection and returns at
+    once, so only this thread ever waits on another worker's write lock.
+    When the queue is full the write is dropped with a warning: the shared
+    stores are caches, and a lost write costs a recomputation at most.
+    Pending writes are flushed at interpreter exit.
+    """
+
+    def __init__(self, path: str, schema: Iterable[str] = (), busy_timeout: float = 5.0,
+                 max_queue: int = 10000, name: str = 'shared-store-writer'):
+        self._db = open_shared_db(path, busy_timeout)
+        for statement in schema:
+            self._db.execute(statement)
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def submit(self, write: Callable[[sqlite3.Connection], None]) -> bool:
+        """Queue a write; False if it was dropped because the queue is full"""
+        try:
+            self._queue.put_nowait(write)
+            return True
+        except queue.Full:
+            logger.warning("Shared store write queue full; dropping write")
+            return False
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Wait until every write queued so far has been applied"""
+        done = threading.Event()
+        try:
+            self._queue.put(lambda db: done.set(), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _run(self) -> None:
+        while True:
+            write = self._queue.get()
+            try:
+                write(self._db)
+            except sqlite3.Error as e:
+                logger.warning("Shared store write failed: %s", e)
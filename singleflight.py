@@ -0,0 +1,37 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one in-flight call.
+
+    The first caller starts the work; callers arriving while it runs await
+    the same task and get its result or its exception. A caller that is
+    cancelled (e.g. its client disconnected) does not cancel the shared work.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._stats = {'calls': 0, 'executions': 0, 'coalesced': 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]) -> Any:
+        self._stats['calls'] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self._stats['executions'] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats['in_flight'] = len(self._inflight)
+        return stats
@@ -0,0 +1,243 @@
+import os
+import json
+import math
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from batch import parse_query_line
+from cache import normalize_query
+from http_pool import count_requests
+from shared_store import open_shared_db
+
+logger = logging.getLogger(__name__)
+
+WARM_ENDPOINTS = ('recommend_tools', 'find_with_ai')
+
+
+class QueryLog:
+    """Append-only JSONL log of served queries, shared by the worker processes on a node.
+
+    Each line is {"ts": ..., "endpoint": ..., "query": ...}. The file is
+    opened per append, so every process's writes land in the current file
+    even after another process rotates it to `<path>.1` past `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10_000_000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(self, endpoint: str, query: str) -> None:
+        line = json.dumps({'ts': round(time.time(), 3), 'endpoint': endpoint, 'query': query}) + '\n'
+        with self._lock:
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                    size = f.tell()
+                if size > self.max_bytes:
+                    os.replace(self.path, self.path + '.1')
+            except OSError as e:
+                logger.warning("Query log write failed: %s", e)
+
+
+def log_files(path: str) -> List[str]:
+    """A query log's rotated file (older entries) and current file, whichever exist"""
+    return [candidate for candidate in (path + '.1', path) if os.path.exists(candidate)]
+
+
+def read_log(path: str, default_endpoint: str = 'recommend_tools') -> Iterator[Tuple[str, str, Optional[float]]]:
+    """Yield (endpoint, query, timestamp) from a query log or any JSONL query file.
+
+    Lines in the batch input formats (a JSON string, or an object with
+    'query' or 'title') are accepted too; they count for the default
+    endpoint and have no timestamp.
+    """
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            query = parse_query_line(line)
+            if not query or not query.strip():
+                continue
+            endpoint, ts = default_endpoint, None
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = None
+            if isinstance(item, dict):
+                if item.get('endpoint') in WARM_ENDPOINTS:
+                    endpoint = item['endpoint']
+                if isinstance(item.get('ts'), (int, float)):
+                    ts = float(item['ts'])
+            yield endpoint, query.strip(), ts
+
+
+def rank_queries(entries, top_n: int, half_life: float = 86400, now: Optional[float] = None) -> List[Tuple[str, str]]:
+    """The top_n (endpoint, query) pairs by frequency with exponential recency decay.
+
+    Each occurrence adds 0.5 ** (age / half_life) to its normalized query's
+    score, so a query asked often yesterday outranks one asked once today.
+    Undated entries count fully. The most recent wording of each query wins.
+    """
+    now = time.time() if now is None else now
+    decay = math.log(2) / half_life
+    scores: Dict[Tuple[str, str], float] = {}
+    wording: Dict[Tuple[str, str], str] = {}
+    for endpoint, query, ts in entries:
+        key = (endpoint, normalize_query(query))
+        if not key[1]:
+            continue
+        age = max(0.0, now - ts) if ts is not None else 0.0
+        scores[key] = scores.get(key, 0.0) + math.exp(-decay * age)
+        wording[key] = query
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_n]
+    return [(endpoint, wording[(endpoint, normalized)]) for endpoint, normalized in ranked]
+
+
+class WarmupLease:
+    """A named lease row in a shared SQLite file, held by one worker process at a time.
+
+    `acquire` takes the lease when it is free or expired and renews it when
+    this process already holds it; a holder that dies is replaced once its
+    lease runs out. Blocking I/O: call it from an executor thread.
+    """
+
+    def __init__(self, path: str, name: str = 'cache_warmer', ttl: float = 600):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._db = open_shared_db(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def acquire(self) -> bool:
+        """Take or renew the lease; True if this process holds it"""
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                    "WHERE leases.owner = excluded.owner OR leases.expires_at <= ?",
+                    (self.name, self.owner, now + self.ttl, now)
+                )
+                row = self._db.execute("SELECT owner FROM leases WHERE name = ?", (self.name,)).fetchone()
+            except sqlite3.OperationalError as e:
+                logger.warning("Warm-up lease check failed: %s", e)
+                return False
+        return row is not None and row[0] == self.owner
+
+    def release(self) -> None:
+        with self._lock:
+            try:
+                self._db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (self.name, self.owner))
+            except sqlite3.OperationalError as e:
+                logger.warning("Warm-up lease release failed: %s", e)
+
+
+class CacheWarmer:
+    """Keep the result cache populated for the most popular logged queries.
+
+    Each run ranks the query log and re-computes every top query whose
+    cached result is missing or expires within `refresh_ahead` seconds, with
+    at most `concurrency` queries in flight. A run stops starting queries
+    once they have sent `max_calls` upstream requests (fan-out and retries
+    included); queries already in flight may finish past it, by at most
+    `concurrency` queries' worth of requests. With a `lease`, only the worker
+    process holding it warms, so a node spends one budget however many
+    workers it runs. Runs start at launch and then every `interval` seconds.
+    """
+
+    def __init__(self, system, log_path: str, top_n: int = 50, concurrency: int = 2, max_calls: int = 100,
+                 interval: float = 300, refresh_ahead: Optional[float] = None, half_life: float = 86400,
+                 lease: Optional[WarmupLease] = None):
+        self.system = system
+        self.log_path = log_path
+        self.top_n = top_n
+        self.concurrency = concurrency
+        self.max_calls = max_calls
+        self.interval = interval
+        # Refresh anything that would expire before the run after next
+        self.refresh_ahead = 2 * interval if refresh_ahead is None else refresh_ahead
+        self.half_life = half_life
+        self.lease = lease
+        self._stats = {'runs': 0, 'warmed': 0, 'fresh': 0, 'errors': 0, 'over_budget': 0, 'calls': 0,
+                       'skipped_runs': 0, 'leader': lease is None, 'last_run': None}
+
+    def load(self) -> List[Tuple[str, str]]:
+        """Top queries from the log (and its rotated predecessor)"""
+        def entries():
+            for path in log_files(self.log_path):
+                yield from read_log(path)
+
+        return rank_queries(entries(), self.top_n, self.half_life)
+
+    async def warm_once(self) -> Dict:
+        """Refresh stale or missing entries for the top queries; returns this run's counts"""
+        run = {'warmed': 0, 'fresh': 0, 'errors': 0, 'over_budget': 0, 'calls': 0}
+        loop = asyncio.get_running_loop()
+        top = await loop.run_in_executor(None, self.load)
+        stale = []
+        for endpoint, query in top:
+            expires_in = self.system.cache_expires_in(endpoint, query)
+            if expires_in is not None and expires_in > self.refresh_ahead:
+                run['fresh'] += 1
+            else:
+                stale.append((endpoint, query))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tally = count_requests()  # inherited by the refresh tasks below
+
+        async def warm(endpoint: str, query: str):
+            async with semaphore:
+                if tally[0] >= self.max_calls:
+                    run['over_budget'] += 1
+                    return
+                try:
+                    await self.system.refresh_async(endpoint, query)
+                    run['warmed'] += 1
+                except Exception as e:
+                    run['errors'] += 1
+                    logger.warning("Cache warm-up failed for %r: %s", query, e)
+
+        await asyncio.gather(*(warm(endpoint, query) for endpoint, query in stale))
+        run['calls'] = tally[0]
+        for key, count in run.items():
+            self._stats[key] += count
+        self._stats['runs'] += 1
+        self._stats['last_run'] = time.time()
+        logger.info("Cache warm-up: %d refreshed, %d still fresh, %d over budget, %d errors, %d upstream calls",
+                    run['warmed'], run['fresh'], run['over_budget'], run['errors'], run['calls'])
+        return run
+
+    async def run_forever(self) -> None:
+        """Warm now, then again every interval, until cancelled; skips runs while another worker holds the lease"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    leader = self.lease is None or await loop.run_in_executor(None, self.lease.acquire)
+                    self._stats['leader'] = leader
+                    if leader:
+                        await self.warm_once()
+                    else:
+                        self._stats['skipped_runs'] += 1
+                except Exception as e:
+                    logger.warning("Cache warm-up run failed: %s", e)
+                await asyncio.sleep(self.interval)
+        finally:
+            if self.lease is not None and self._stats['leader']:
+                # Let another worker take over at its next run rather than after the lease expires
+                self.lease.release()
+
+    def stats(self) -> Dict:
+        return dict(self._stats)